@@ -0,0 +1,609 @@
+#!/usr/bin/env python3
+"""
+Generate the single-pod supervisor manifest set from the legacy multi-Deployment k3s layout.
+
+Inputs:
+- the multi-Deployment YAML (one Deployment per category DVR child)
+- the HDHR wizard-lane test Deployment YAML
+
+Outputs:
+- supervisor.json for `iptv-tunerr supervise -config ...`
+- a single-pod k3s manifest (ConfigMap + Deployment + per-child Services)
+- a cutover TSV mapping old per-Deployment URIs to new single-pod base URLs
+
+Overflow support: with --category-counts-json (base category -> confirmed linked
+channel count) and --category-cap, large categories are expanded into shards
+(`cat`, `cat2`, `cat3`, ...) with per-child IPTV_TUNERR_LINEUP_SKIP/TAKE.
+See docs/reference/testing-and-supervisor-config.md.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import tempfile
+from functools import lru_cache
+from operator import itemgetter
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Iterator, Mapping
+
+import yaml
+
+# libyaml-backed loader/dumper when PyYAML was built against it; the pure-Python
+# classes are a drop-in fallback.
+_YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+_YamlDumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+try:
+    import orjson
+
+    def _dumps_indent2(obj: Any) -> str:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+except ImportError:
+
+    def _dumps_indent2(obj: Any) -> str:
+        return json.dumps(obj, indent=2)
+
+
+_WS_DEL_TABLE = str.maketrans("", "", " \t\n\r\v\f")
+_CA_POSTAL_RE = re.compile(r"^[A-Z]\d[A-Z]\d[A-Z]\d$")
+
+# Locale-hint tables for preset selection; extend alongside
+# REGION_BUCKET_PRESETS when new buckets land.
+_NA_COUNTRIES = frozenset({"CA", "CAN", "US", "USA"})
+_TZ_PREFIX_BUCKETS = {"america/": "na_en"}
+
+CATEGORIES = [
+    "bcastus",
+    "newsus",
+    "sportsus",
+    "generalent",
+    "movies",
+    "kids",
+    "music",
+    "documentary",
+    "lifestyle",
+    "latino",
+    "intl",
+    "canada",
+    "otherworld",
+]
+_CATEGORIES_LOWER = tuple(c.lower() for c in CATEGORIES)
+
+# Wizard-lane shaping presets keyed by region bucket. Only na_en exists today;
+# the preset keys mirror the IPTV_TUNERR_LINEUP_* / XMLTV_* env surface.
+# Presets are read-only views; callers only index into them.
+REGION_BUCKET_PRESETS: dict[str, Mapping[str, str]] = {
+    name: MappingProxyType(preset)
+    for name, preset in {
+        "na_en": {
+            "lineup_shape": "na_en",
+            "lineup_max_channels": "479",
+            "lineup_drop_music": "true",
+            "region_profile": "ca_west",
+            "xmltv_prefer_langs": "en,eng",
+            "xmltv_prefer_latin": "true",
+            "xmltv_non_latin_title_fallback": "channel",
+            "hdhr_scan_possible": "true",
+        },
+    }.items()
+}
+
+
+@lru_cache(maxsize=32)
+def choose_hdhr_preset(tz: str, country: str, postal_code: str) -> tuple[str, Mapping[str, str]]:
+    """Pick a region bucket preset for the HDHR wizard lane from coarse locale hints."""
+    # Only one bucket exists today; skip locale sniffing until a second
+    # preset gives the hints something to choose between.
+    if len(REGION_BUCKET_PRESETS) > 1:
+        tz_l = (tz or "").strip().lower()
+        country_u = (country or "").strip().upper()
+        pc = (postal_code or "").translate(_WS_DEL_TABLE).upper()
+        if _CA_POSTAL_RE.match(pc):
+            return "na_en", REGION_BUCKET_PRESETS["na_en"]
+        if country_u in _NA_COUNTRIES:
+            return "na_en", REGION_BUCKET_PRESETS["na_en"]
+        bucket = next((b for p, b in _TZ_PREFIX_BUCKETS.items() if tz_l.startswith(p)), None)
+        if bucket is not None:
+            return bucket, REGION_BUCKET_PRESETS[bucket]
+    return "na_en", REGION_BUCKET_PRESETS["na_en"]
+
+
+# On-disk cache of parsed YAML, keyed by content hash; JSON loads much faster
+# than re-parsing YAML on every shell invocation. Stale entries are harmless
+# (the key changes with the content) but never expired here.
+_DISK_CACHE_DIR = Path.home() / ".cache" / "iptvtunerr" / "manifests"
+
+
+def _disk_cache_read(sha: str) -> tuple[dict[str, Any], ...] | None:
+    try:
+        return tuple(json.loads((_DISK_CACHE_DIR / f"{sha}.json").read_text()))
+    except (OSError, ValueError):
+        return None
+
+
+def _disk_cache_write(sha: str, docs: tuple[dict[str, Any], ...]) -> None:
+    # Temp file + rename so concurrent runs never observe a partial cache entry.
+    try:
+        _DISK_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=_DISK_CACHE_DIR, suffix=".tmp")
+    except OSError:
+        return
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(list(docs), f)
+        os.replace(tmp, _DISK_CACHE_DIR / f"{sha}.json")
+    except (OSError, TypeError, ValueError):
+        # Docs with non-JSON values (SafeLoader parses e.g. the
+        # creationTimestamp in kubectl exports into datetime) just skip the
+        # disk layer; coercing them with default=str would make cache hits
+        # disagree with a fresh parse.
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+
+
+@lru_cache(maxsize=32)
+def _load_yaml_docs_cached(path_str: str, mtime_ns: int, size: int, use_disk_cache: bool) -> tuple[dict[str, Any], ...]:
+    # Feed bytes straight to the loader; libyaml consumes them without an
+    # extra Python-level decode pass. mtime/size key the cache so a changed
+    # file re-parses.
+    data = Path(path_str).read_bytes()
+    sha = ""
+    if use_disk_cache:
+        sha = hashlib.sha256(data).hexdigest()
+        cached = _disk_cache_read(sha)
+        if cached is not None:
+            return cached
+    docs = tuple(d for d in yaml.load_all(data, Loader=_YamlLoader) if d)
+    if use_disk_cache:
+        _disk_cache_write(sha, docs)
+    return docs
+
+
+def load_yaml_docs(path: Path, use_disk_cache: bool = True) -> list[dict[str, Any]]:
+    st = path.stat()
+    return list(_load_yaml_docs_cached(str(path), st.st_mtime_ns, st.st_size, use_disk_cache))
+
+
+def _safe_int(s: str, default: int = 0) -> int:
+    return int(s) if s.isdigit() else default
+
+
+def parse_addr(args: list[str]) -> str:
+    return next((a.split(":", 1)[1] for a in args if a.startswith("-addr=:")), "5004")
+
+
+_COUNT_FIELDS = ("confirmed_epg_stream_count", "linked_count", "count", "epg_linked")
+
+# Env vars category children inherit verbatim from their legacy Deployment.
+_INHERITED_ENV_KEYS = (
+    "IPTV_TUNERR_M3U_URL",
+    "IPTV_TUNERR_EPG_URL",
+    "IPTV_TUNERR_PROVIDER_URL",
+    "IPTV_TUNERR_DEVICE_ID",
+    "IPTV_TUNERR_FRIENDLY_NAME",
+    "IPTV_TUNERR_TUNER_COUNT",
+    "IPTV_TUNERR_GUIDE_NUMBER_OFFSET",
+    "IPTV_TUNERR_EPG_FORCE_LINEUP_MATCH",
+)
+
+# Fixed env every category child gets, merged in one literal per shard.
+_CATEGORY_CONST_ENV = {
+    "IPTV_TUNERR_SSDP_DISABLED": "true",
+    "IPTV_TUNERR_HDHR_SCAN_POSSIBLE": "false",
+    "IPTV_TUNERR_XMLTV_PREFER_LANGS": "en,eng",
+    "IPTV_TUNERR_XMLTV_PREFER_LATIN": "true",
+    "IPTV_TUNERR_XMLTV_NON_LATIN_TITLE_FALLBACK": "channel",
+}
+
+
+def _count_from_str(v: str) -> int | None:
+    s = v.strip()
+    return int(s) if s.isdigit() else None
+
+
+def _count_from_dict(v: dict) -> int | None:
+    for field in _COUNT_FIELDS:
+        if field in v:
+            return _coerce_count(v[field])
+    return None
+
+
+# Exact-type dispatch: one dict hit instead of an isinstance ladder. bool maps
+# to nothing on purpose (it would otherwise coerce via int).
+_COUNT_DISPATCH: dict[type, Any] = {
+    int: int,
+    float: int,
+    str: _count_from_str,
+    dict: _count_from_dict,
+}
+
+
+def _coerce_count(v: Any) -> int | None:
+    """Coerce a counts value (int, numeric string, or report dict) to int, or None."""
+    fn = _COUNT_DISPATCH.get(type(v))
+    return fn(v) if fn is not None else None
+
+
+def parse_category_counts(payload: Any) -> dict[str, int]:
+    """Coerce a counts JSON payload into {category: linked_count}.
+
+    Accepts plain ints, numeric strings, or per-category dicts from the
+    channel-diff report (confirmed_epg_stream_count / linked_count / count).
+    """
+    if not isinstance(payload, dict):
+        return {}
+    return {
+        key: n
+        for k, v in payload.items()
+        if (key := str(k).strip().lower()) and (n := _coerce_count(v)) is not None and n >= 0
+    }
+
+
+def expand_category_shards(counts: dict[str, int], base_categories: list[str], cap: int) -> Iterator[dict[str, Any]]:
+    """Yield base categories expanded into overflow shards with lineup skip/take windows."""
+    lowered = _CATEGORIES_LOWER if base_categories is CATEGORIES else tuple(c.lower() for c in base_categories)
+    for base, base_l in zip(base_categories, lowered):
+        total = counts.get(base_l, 0)
+        if total <= cap:
+            yield {"name": base, "category": base, "skip": 0, "take": 0, "shard_index": 0}
+            continue
+        remaining = total
+        skip = 0
+        i = 0
+        while remaining > 0:
+            yield {
+                "name": base if i == 0 else f"{base}{i + 1}",
+                "category": base,
+                "skip": skip,
+                "take": min(cap, remaining),
+                "shard_index": i,
+            }
+            remaining -= cap
+            skip += cap
+            i += 1
+
+
+def _build_child_instance(
+    idx: int,
+    shard: dict[str, Any],
+    env_maps: dict[str, dict[str, str]],
+    base_port: int,
+    guide_offset_step: int,
+) -> dict[str, Any] | None:
+    """Build one category-child supervisor instance, or None if the shard's
+    base category has no legacy Deployment to inherit from."""
+    env_map = env_maps.get(f"iptvtunerr-{shard['category']}")
+    if env_map is None:
+        return None
+    child_port = str(base_port + idx)
+    child_env = {
+        **{k: env_map[k] for k in _INHERITED_ENV_KEYS if k in env_map},
+        "IPTV_TUNERR_BASE_URL": f"http://iptvtunerr-{shard['name']}.plex.svc:{child_port}",
+        **_CATEGORY_CONST_ENV,
+        "IPTV_TUNERR_DEVICE_ID": shard["name"],
+    }
+    skip = shard["skip"]
+    take = shard["take"]
+    shard_index = shard["shard_index"]
+    if skip > 0:
+        child_env["IPTV_TUNERR_LINEUP_SKIP"] = str(skip)
+    if take > 0:
+        child_env["IPTV_TUNERR_LINEUP_TAKE"] = str(take)
+    if shard_index > 0:
+        base_off = _safe_int(child_env.get("IPTV_TUNERR_GUIDE_NUMBER_OFFSET", "0"))
+        child_env["IPTV_TUNERR_GUIDE_NUMBER_OFFSET"] = str(base_off + shard_index * guide_offset_step)
+    return {
+        "name": shard["name"],
+        "args": ["run", "-mode", "easy", f"-addr=:{child_port}"],
+        "env": child_env,
+    }
+
+
+def build_supervisor_json(
+    multi_deploys: list[dict[str, Any]],
+    hdhr_deploy: dict[str, Any],
+    preset: Mapping[str, str],
+    counts: dict[str, int],
+    category_cap: int,
+    hdhr_total_channels: int,
+    base_port: int = 5101,
+    guide_offset_step: int = 1000,
+    by_name: dict[str, dict[str, Any]] | None = None,
+) -> dict[str, Any]:
+    if by_name is None:
+        by_name = {d["metadata"]["name"]: d for d in multi_deploys}
+
+    hdhr_tmpl = hdhr_deploy["spec"]["template"]["spec"]
+    hdhr_container = hdhr_tmpl["containers"][0]
+    hdhr_base = next(
+        (
+            a.split("=", 1)[1]
+            for a in hdhr_container.get("args", ())
+            if isinstance(a, str) and a.startswith("-base-url=")
+        ),
+        "http://iptvtunerr-hdhr.plex.home",
+    )
+    hdhr_common_env = {
+        item["name"]: str(item["value"]) for item in hdhr_container.get("env") or [] if "value" in item
+    }
+
+    per_shard = int(preset["lineup_max_channels"])
+    n_shards = max(1, (hdhr_total_channels + per_shard - 1) // per_shard)
+
+    instances: list[dict[str, Any]] = []
+    for shard_idx in range(n_shards):
+        name = "hdhr-main" if shard_idx == 0 else f"hdhr-main{shard_idx + 1}"
+        port = 5004 + shard_idx
+        env = dict(hdhr_common_env)
+        env["IPTV_TUNERR_LINEUP_MAX_CHANNELS"] = preset["lineup_max_channels"]
+        env["IPTV_TUNERR_LINEUP_SHAPE"] = preset["lineup_shape"]
+        env["IPTV_TUNERR_LINEUP_DROP_MUSIC"] = preset["lineup_drop_music"]
+        env["IPTV_TUNERR_LINEUP_REGION_PROFILE"] = preset["region_profile"]
+        env["IPTV_TUNERR_XMLTV_PREFER_LANGS"] = preset["xmltv_prefer_langs"]
+        env["IPTV_TUNERR_XMLTV_PREFER_LATIN"] = preset["xmltv_prefer_latin"]
+        env["IPTV_TUNERR_XMLTV_NON_LATIN_TITLE_FALLBACK"] = preset["xmltv_non_latin_title_fallback"]
+        env["IPTV_TUNERR_HDHR_SCAN_POSSIBLE"] = preset["hdhr_scan_possible"] if shard_idx == 0 else "false"
+        if shard_idx > 0:
+            env["IPTV_TUNERR_LINEUP_SKIP"] = str(shard_idx * per_shard)
+            env["IPTV_TUNERR_LINEUP_TAKE"] = preset["lineup_max_channels"]
+            env["IPTV_TUNERR_GUIDE_NUMBER_OFFSET"] = str(shard_idx * per_shard)
+            env["IPTV_TUNERR_BASE_URL"] = f"{hdhr_base.rstrip('/')}:{port}"
+        instances.append(
+            {
+                "name": name,
+                "args": ["run", "-mode", "full", f"-addr=:{port}"],
+                "env": env,
+            }
+        )
+
+    # Overflow shards of the same base category reuse one parsed env map
+    # instead of re-walking the container env list per shard.
+    env_maps = {
+        name: {
+            item["name"]: str(item["value"])
+            for item in d["spec"]["template"]["spec"]["containers"][0].get("env") or []
+            if "value" in item
+        }
+        for name, d in by_name.items()
+    }
+
+    category_shards = expand_category_shards(counts, CATEGORIES, category_cap)
+    instances.extend(
+        inst
+        for idx, shard in enumerate(category_shards)
+        if (inst := _build_child_instance(idx, shard, env_maps, base_port, guide_offset_step)) is not None
+    )
+
+    return {
+        "restart": True,
+        "restartDelay": "3s",
+        "failFast": False,
+        "instances": instances,
+    }
+
+
+def _clone(x: Any) -> Any:
+    """Fast deep clone for JSON-shaped data (dicts/lists/scalars only)."""
+    return json.loads(json.dumps(x)) if x else x
+
+
+def _split_instances(cfg: dict[str, Any]) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+    """Partition supervisor instances into (hdhr wizard shards, category children) in one pass."""
+    hdhr: list[dict[str, Any]] = []
+    cats: list[dict[str, Any]] = []
+    for inst in cfg["instances"]:
+        (hdhr if inst["name"].startswith("hdhr-main") else cats).append(inst)
+    return hdhr, cats
+
+
+def build_singlepod_manifest(
+    supervisor_cfg: dict[str, Any],
+    hdhr_deploy: dict[str, Any],
+    image: str,
+    namespace: str = "plex",
+    supervisor_cfg_json: str | None = None,
+) -> list[dict[str, Any]]:
+    hdhr_tmpl = hdhr_deploy["spec"]["template"]["spec"]
+    hdhr_container = hdhr_tmpl["containers"][0]
+
+    if supervisor_cfg_json is None:
+        supervisor_cfg_json = _dumps_indent2(supervisor_cfg)
+    configmap = {
+        "apiVersion": "v1",
+        "kind": "ConfigMap",
+        "metadata": {"name": "iptvtunerr-supervisor", "namespace": namespace},
+        "data": {"supervisor.json": supervisor_cfg_json},
+    }
+
+    hdhr_shards, category_instances = _split_instances(supervisor_cfg)
+    category_ports = [int(parse_addr(inst["args"])) for inst in category_instances]
+
+    # One fused pass: instances are ordered hdhr shards first, then category
+    # children, so container ports and Services come out in the same order the
+    # two separate loops produced.
+    ports = [{"name": "hdhr-http", "containerPort": 5004, "protocol": "TCP"}]
+    services: list[dict[str, Any]] = []
+    for shard_idx, shard in enumerate(hdhr_shards):
+        port = 5004 + shard_idx
+        if shard_idx > 0:
+            ports.append({"name": f"p{port}", "containerPort": port, "protocol": "TCP"})
+        svc_name = "iptvtunerr-hdhr" if shard_idx == 0 else f"iptvtunerr-hdhr{shard_idx + 1}"
+        services.append(
+            {
+                "apiVersion": "v1",
+                "kind": "Service",
+                "metadata": {"name": svc_name, "namespace": namespace},
+                "spec": {
+                    "selector": {"app": "iptvtunerr-singlepod"},
+                    "ports": [{"name": "http", "port": port, "targetPort": port}],
+                    "type": "LoadBalancer",
+                },
+            }
+        )
+    for inst, port in zip(category_instances, category_ports):
+        ports.append({"name": f"p{port}", "containerPort": port, "protocol": "TCP"})
+        services.append(
+            {
+                "apiVersion": "v1",
+                "kind": "Service",
+                "metadata": {"name": f"iptvtunerr-{inst['name']}", "namespace": namespace},
+                "spec": {
+                    "selector": {"app": "iptvtunerr-singlepod"},
+                    "ports": [{"name": "http", "port": port, "targetPort": port}],
+                    "type": "ClusterIP",
+                },
+            }
+        )
+    ports.append({"name": "hdhr-disc-udp", "containerPort": 65001, "protocol": "UDP"})
+    ports.append({"name": "hdhr-disc-tcp", "containerPort": 65001, "protocol": "TCP"})
+
+    deployment = {
+        "apiVersion": "apps/v1",
+        "kind": "Deployment",
+        "metadata": {"name": "iptvtunerr-singlepod", "namespace": namespace},
+        "spec": {
+            "replicas": 1,
+            "selector": {"matchLabels": {"app": "iptvtunerr-singlepod"}},
+            "template": {
+                "metadata": {"labels": {"app": "iptvtunerr-singlepod"}},
+                "spec": {
+                    "nodeSelector": _clone(hdhr_tmpl.get("nodeSelector", {"media": "plex"})),
+                    "dnsConfig": _clone(hdhr_tmpl.get("dnsConfig", {})),
+                    "containers": [
+                        {
+                            "name": "iptvtunerr",
+                            "image": image,
+                            "imagePullPolicy": "IfNotPresent",
+                            "args": ["supervise", "-config", "/config/supervisor.json"],
+                            "envFrom": [dict(e) for e in hdhr_container.get("envFrom", [])],
+                            "resources": _clone(hdhr_container.get("resources", {})),
+                            "ports": ports,
+                            "volumeMounts": [{"name": "supervisor-config", "mountPath": "/config"}],
+                        }
+                    ],
+                    "volumes": [
+                        {
+                            "name": "supervisor-config",
+                            "configMap": {"name": "iptvtunerr-supervisor"},
+                        }
+                    ],
+                },
+            },
+        },
+    }
+
+    return [configmap, deployment] + services
+
+
+def _row_to_tsv(inst: dict[str, Any]) -> str:
+    cat = inst["name"]
+    env = inst.get("env", {})
+    old_uri = f"http://iptvtunerr-{cat}.plex.svc:5004"
+    new_uri = env.get("IPTV_TUNERR_BASE_URL", "")
+    return "\t".join(
+        (
+            cat,
+            old_uri,
+            new_uri,
+            "no" if old_uri == new_uri else "yes",
+            env.get("IPTV_TUNERR_DEVICE_ID", ""),
+            env.get("IPTV_TUNERR_FRIENDLY_NAME", ""),
+        )
+    )
+
+
+def iter_cutover_tsv_lines(supervisor_cfg: dict[str, Any]):
+    """Yield cutover TSV lines (header first) so callers can stream to disk."""
+    yield "# category\told_uri\tnew_uri\turi_changed\tdevice_id\tfriendly_name"
+    _, category_instances = _split_instances(supervisor_cfg)
+    for inst in sorted(category_instances, key=itemgetter("name")):
+        yield _row_to_tsv(inst)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Generate single-pod supervisor manifests from the multi-Deployment layout")
+    ap.add_argument("--root", default=".", help="Directory containing the input YAMLs and receiving outputs")
+    ap.add_argument("--deployments-yaml", default="iptvtunerr-deployments-multi.yaml", help="Multi-Deployment input YAML")
+    ap.add_argument("--hdhr-yaml", default="iptvtunerr-hdhr-test-deployment.yaml", help="HDHR wizard-lane Deployment YAML")
+    ap.add_argument("--out-yaml", default="iptvtunerr-singlepod.yaml", help="Output single-pod manifest YAML")
+    ap.add_argument("--out-json", default="supervisor.json", help="Output supervisor config JSON")
+    ap.add_argument("--out-tsv", default="cutover.tsv", help="Output cutover mapping TSV")
+    ap.add_argument("--image", default="ghcr.io/snapetech/iptvtunerr:latest", help="Container image for the single pod")
+    ap.add_argument("--namespace", default="plex", help="Target namespace")
+    ap.add_argument("--hdhr-total-channels", type=int, default=479, help="Total channels across HDHR wizard shards")
+    ap.add_argument("--category-cap", type=int, default=479, help="Overflow threshold and shard take size")
+    ap.add_argument("--category-counts-json", default="", help="JSON map of base category -> linked channel count")
+    ap.add_argument("--hdhr-region-profile", default="auto", help="Region bucket preset name, or 'auto'")
+    ap.add_argument("--tz", default="", help="Timezone hint for auto preset selection")
+    ap.add_argument("--country", default="", help="Country hint for auto preset selection")
+    ap.add_argument("--postal-code", default="", help="Postal code hint for auto preset selection")
+    ap.add_argument("--no-cache", action="store_true", help="Bypass the on-disk parsed-YAML cache")
+    args = ap.parse_args()
+
+    root = Path(args.root).resolve()
+
+    if args.hdhr_region_profile == "auto":
+        profile_name, preset = choose_hdhr_preset(args.tz, args.country, args.postal_code)
+    else:
+        profile_name = args.hdhr_region_profile
+        if profile_name not in REGION_BUCKET_PRESETS:
+            print(f"ERROR: unknown region profile: {profile_name}", file=sys.stderr)
+            return 2
+        preset = REGION_BUCKET_PRESETS[profile_name]
+
+    counts: dict[str, int] = {}
+    if args.category_counts_json:
+        counts = parse_category_counts(json.loads(Path(args.category_counts_json).read_text()))
+
+    use_disk_cache = not args.no_cache
+    multi = load_yaml_docs(root / args.deployments_yaml, use_disk_cache=use_disk_cache)
+    hdhr_docs = load_yaml_docs(root / args.hdhr_yaml, use_disk_cache=use_disk_cache)
+    hdhr = next((d for d in hdhr_docs if d.get("kind") == "Deployment"), None)
+    if hdhr is None:
+        print(f"ERROR: no Deployment found in {args.hdhr_yaml}", file=sys.stderr)
+        return 2
+
+    multi_deploys = [d for d in multi if d.get("kind") == "Deployment"]
+    by_name = {d["metadata"]["name"]: d for d in multi_deploys}
+    sup = build_supervisor_json(
+        multi_deploys,
+        hdhr,
+        preset,
+        counts,
+        args.category_cap,
+        args.hdhr_total_channels,
+        by_name=by_name,
+    )
+    # Serialize once; the ConfigMap embeds the same string written to disk.
+    sup_json = _dumps_indent2(sup)
+    manifest = build_singlepod_manifest(
+        sup, hdhr, args.image, namespace=args.namespace, supervisor_cfg_json=sup_json
+    )
+
+    with (root / args.out_json).open("w") as f:
+        f.write(sup_json)
+        f.write("\n")
+    # Wide buffer so the emitter isn't flushing per small write.
+    with (root / args.out_yaml).open("w", buffering=1 << 20) as f:
+        yaml.dump_all(manifest, f, Dumper=_YamlDumper, sort_keys=False)
+    with (root / args.out_tsv).open("w") as f:
+        for line in iter_cutover_tsv_lines(sup):
+            f.write(line)
+            f.write("\n")
+    print(f"profile={profile_name} instances={len(sup['instances'])} docs={len(manifest)}")
+    print(f"Wrote {root / args.out_json}")
+    print(f"Wrote {root / args.out_yaml}")
+    print(f"Wrote {root / args.out_tsv}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -6,6 +6,8 @@ from __future__ import annotations
 
 import argparse
 import json
+from array import array
+import mmap
 import os
 import re
 import statistics
@@ -15,29 +17,122 @@ from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Any
 import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# Log lines are "[iptv-tunerr] YYYY/MM/DD HH:MM:SS <msg>"; the prefix plus
+# timestamp is a fixed 34 bytes, so a startswith + slice replaces the regex.
+_PLEX_PREFIX = b"[iptv-tunerr] "
+_PLEX_MSG_OFFSET = len(_PLEX_PREFIX) + len(b"2006/01/02 15:04:05 ")
+REQ_RE = re.compile(rb"\breq=(r\d+)\b")
+# Below this size a parallel parse costs more in worker spin-up than it saves.
+_PARALLEL_MIN_BYTES = 8 << 20
+# Up to this size the serial path slurps the whole log and lets
+# bytes.splitlines do the line split in one C pass; above it, stream via mmap.
+_WHOLE_READ_MAX_BYTES = 256 << 20
+
+# Lowercased tokens that decide whether a PMS log file is worth line-scanning.
+_PMS_NEEDLES = (b"failed to find consumer", b"dash_init_404", b"/livetv/sessions/")
+# Case-insensitive compiled forms so mmapped files are searched in place,
+# without materializing a lowercased copy of the whole buffer.
+_PMS_NEEDLE_RES = tuple(re.compile(re.escape(n), re.IGNORECASE) for n in _PMS_NEEDLES)
+
+
+def _iter_files(root: Path):
+    """Depth-first scandir walk yielding DirEntry objects for regular files."""
+    stack = [str(root)]
+    while stack:
+        try:
+            it = os.scandir(stack.pop())
+        except OSError:
+            continue
+        with it:
+            for e in it:
+                try:
+                    if e.is_dir(follow_symlinks=False):
+                        stack.append(e.path)
+                    elif e.is_file(follow_symlinks=False):
+                        yield e
+                except OSError:
+                    continue
 
 
-PLEX_PREFIX_RE = re.compile(r"^\[iptv-tunerr\]\s+\d{4}/\d{2}/\d{2}\s+\d{2}:\d{2}:\d{2}\s+(.*)$")
-REQ_RE = re.compile(r"\breq=(r\d+)\b")
-BOOL_RE = {"true": True, "false": False}
+def _iter_text_lines(fh, bufsize: int = 1 << 20):
+    """Yield newline-stripped lines from chunked reads; str.split does the
+    per-line work in C instead of a rstrip per iterated line."""
+    buf = ""
+    while True:
+        chunk = fh.read(bufsize)
+        if not chunk:
+            if buf:
+                yield buf
+            return
+        buf += chunk
+        parts = buf.split("\n")
+        buf = parts.pop()
+        yield from parts
 
 
 def parse_duration_ms(s: str) -> float | None:
+    # Every Go duration here ends in "s"; the character before it picks the
+    # unit in one branch instead of an endswith per candidate suffix.
     s = s.strip()
     try:
-        if s.endswith("ms"):
-            return float(s[:-2])
-        if s.endswith("s"):
+        if len(s) >= 2 and s[-1] == "s":
+            c = s[-2]
+            if c == "m":
+                return float(s[:-2])
+            if c == "u" or c == "µ":
+                return float(s[:-2]) / 1000.0
             return float(s[:-1]) * 1000.0
-        if s.endswith("us"):
-            return float(s[:-2]) / 1000.0
-        if s.endswith("µs"):
-            return float(s[:-2]) / 1000.0
     except ValueError:
         return None
     return None
 
 
+class RunningStats:
+    """Welford-style online count/min/max/mean; raw values kept only so the
+    median stays exact."""
+
+    __slots__ = ("n", "min", "max", "mean", "values")
+
+    def __init__(self) -> None:
+        self.n = 0
+        self.min = 0.0
+        self.max = 0.0
+        self.mean = 0.0
+        self.values = array("d")
+
+    def add(self, x: float) -> None:
+        self.n += 1
+        if self.n == 1:
+            self.min = self.max = x
+        else:
+            if x < self.min:
+                self.min = x
+            if x > self.max:
+                self.max = x
+        self.mean += (x - self.mean) / self.n
+        self.values.append(x)
+
+    def merge(self, other: "RunningStats") -> None:
+        for x in other.values:
+            self.add(x)
+
+    def summary(self) -> dict[str, float] | None:
+        if not self.n:
+            return None
+        out = {"count": float(self.n), "min": self.min, "max": self.max, "avg": self.mean}
+        if self.n >= 2:
+            out["p50"] = statistics.median(self.values)
+        return out
+
+
 def stats(nums: list[float]) -> dict[str, float] | None:
     if not nums:
         return None
@@ -63,7 +158,13 @@ class ReqTrace:
     releases: int = 0
     tuner_reject: int = 0
     startup_gate_timeout: int = 0
-    startup_gate_buffered: list[dict[str, Any]] = field(default_factory=list)
+    # Gate events as parallel columns (idr/aac stored as 0/1) instead of a
+    # list of per-event dicts; the report only needs counts over them.
+    gate_buffered: array = field(default_factory=lambda: array("l"))
+    gate_ts_pkts: array = field(default_factory=lambda: array("l"))
+    gate_idr: array = field(default_factory=lambda: array("b"))
+    gate_aac: array = field(default_factory=lambda: array("b"))
+    gate_align: array = field(default_factory=lambda: array("l"))
     null_keepalive_starts: int = 0
     null_keepalive_stops: Counter = field(default_factory=Counter)
     bootstrap_ts_bytes: list[int] = field(default_factory=list)
@@ -74,19 +175,25 @@ class ReqTrace:
 
 
 class Parser:
-    recv_re = re.compile(r'req=(r\d+)\s+recv path="([^"]+)" channel="([^"]+)"')
-    acquire_re = re.compile(r'req=(r\d+).*?\bacquire inuse=(\d+)/(\d+)')
-    release_re = re.compile(r'req=(r\d+).*?\brelease inuse=(\d+)/(\d+) dur=([^\s]+)')
-    reject_re = re.compile(r'req=(r\d+).*?reject all-tuners-in-use')
-    ffmpeg_mode_re = re.compile(r'(ffmpeg-(?:transcode|remux))')
-    first_bytes_re = re.compile(r'req=(r\d+).*?\bfirst-bytes=(\d+)\s+startup=([^\s]+)')
+    # req= is extracted once per line by REQ_RE; the per-message patterns
+    # anchor on their own tokens so the engine never walks a .*? prefix.
+    recv_re = re.compile(rb'recv path="([^"]+)" channel="([^"]+)"')
+    acquire_re = re.compile(rb'\bacquire inuse=(\d+)/(\d+)')
+    release_re = re.compile(rb'\brelease inuse=(\d+)/(\d+) dur=([^\s]+)')
+    first_bytes_re = re.compile(rb'\bfirst-bytes=(\d+)\s+startup=([^\s]+)')
     startup_gate_re = re.compile(
-        r'req=(r\d+).*?startup-gate buffered=(\d+).*?ts_pkts=(\d+)\s+idr=(true|false)\s+aac=(true|false)\s+align=(-?\d+)(?:\s+release=(\S+))?'
+        rb'startup-gate buffered=(\d+).*?ts_pkts=(\d+)\s+idr=(true|false)\s+aac=(true|false)\s+align=(-?\d+)(?:\s+release=(\S+))?'
+    )
+    null_keepalive_stop_re = re.compile(rb'null-ts-keepalive stop=([a-z-]+)')
+    bootstrap_ts_re = re.compile(rb'bootstrap-ts bytes=(\d+)')
+
+    # One union scan decides whether a line is interesting at all; the
+    # specific pattern only runs after this first pass hits.
+    classifier_re = re.compile(
+        rb'(recv path=|acquire inuse=|release inuse=|reject all-tuners-in-use'
+        rb'|first-bytes=|startup-gate|null-ts-keepalive|bootstrap-ts bytes='
+        rb'|ffmpeg-(?:transcode|remux))'
     )
-    startup_gate_timeout_re = re.compile(r'req=(r\d+).*?startup-gate timeout')
-    null_keepalive_start_re = re.compile(r'req=(r\d+).*?null-ts-keepalive start')
-    null_keepalive_stop_re = re.compile(r'req=(r\d+).*?null-ts-keepalive stop=([a-z-]+)')
-    bootstrap_ts_re = re.compile(r'req=(r\d+).*?bootstrap-ts bytes=(\d+)')
 
     curl_start_re = re.compile(r"^===\s+(\S+)\s+(\S+)\s+([0-9T:+-]+)\s+===$")
     wc_re = re.compile(r"^\s*(\d+)\s+(.+)$")
@@ -103,128 +210,215 @@ class Parser:
         self.counters: Counter = Counter()
         self.inuse_samples: list[int] = []
         self.limit_samples: list[int] = []
-        self.release_durations_ms: list[float] = []
-        self.first_bytes_ms: list[float] = []
+        self.release_durations_ms = RunningStats()
+        self.first_bytes_ms = RunningStats()
         self.curl_sections: list[dict[str, Any]] = []
         self.pms_counts: Counter = Counter()
         self.pms_session_ids: Counter = Counter()
-        self.pms_samples: dict[str, list[str]] = defaultdict(list)
+        self.pms_samples: dict[str, list[str]] = {}
         self.pms_snapshot_players: Counter = Counter()
         self.pms_snapshot_products: Counter = Counter()
         self.pms_snapshot_platforms: Counter = Counter()
         self.pms_snapshot_session_ids: Counter = Counter()
         self.pms_snapshot_video_counts: list[int] = []
         self.plex_web_probe: dict[str, Any] = {}
+        # (key, regex, lowercased needle): the substring test runs first so the
+        # regex only sees lines that can match.
+        self._pms_pattern_list = tuple(
+            (key, rx, needle)
+            for (key, rx), needle in zip(
+                self.pms_patterns.items(),
+                ("failed to find consumer", "dash_init_404", "/livetv/sessions/"),
+            )
+        )
 
     def req(self, req_id: str) -> ReqTrace:
         if req_id not in self.reqs:
             self.reqs[req_id] = ReqTrace(req=req_id)
         return self.reqs[req_id]
 
-    def parse_plex_log(self, path: Path) -> None:
+    def _scan_plex_mmap(self, mm: mmap.mmap, pos: int, end: int) -> None:
+        while pos < end:
+            nl = mm.find(b"\n", pos, end)
+            if nl == -1:
+                raw, pos = mm[pos:end], end
+            else:
+                raw, pos = mm[pos:nl], nl + 1
+            self._handle_plex_line(raw)
+
+    def _merge_from(self, other: "Parser") -> None:
+        """Fold a worker's partial parse state into this parser."""
+        for req_id, o in other.reqs.items():
+            r = self.req(req_id)
+            if r.channel_id is None:
+                r.channel_id = o.channel_id
+            if r.channel_name is None:
+                r.channel_name = o.channel_name
+            if r.path is None:
+                r.path = o.path
+            r.recv += o.recv
+            r.acquires += o.acquires
+            r.releases += o.releases
+            r.tuner_reject += o.tuner_reject
+            r.startup_gate_timeout += o.startup_gate_timeout
+            r.gate_buffered.extend(o.gate_buffered)
+            r.gate_ts_pkts.extend(o.gate_ts_pkts)
+            r.gate_idr.extend(o.gate_idr)
+            r.gate_aac.extend(o.gate_aac)
+            r.gate_align.extend(o.gate_align)
+            r.null_keepalive_starts += o.null_keepalive_starts
+            r.null_keepalive_stops.update(o.null_keepalive_stops)
+            r.bootstrap_ts_bytes.extend(o.bootstrap_ts_bytes)
+            r.first_bytes_startup_ms.extend(o.first_bytes_startup_ms)
+            r.first_bytes_sizes.extend(o.first_bytes_sizes)
+            r.ffmpeg_modes.update(o.ffmpeg_modes)
+            r.lines += o.lines
+        self.counters.update(other.counters)
+        self.inuse_samples.extend(other.inuse_samples)
+        self.limit_samples.extend(other.limit_samples)
+        self.release_durations_ms.merge(other.release_durations_ms)
+        self.first_bytes_ms.merge(other.first_bytes_ms)
+
+    def parse_plex_log(self, path: Path, jobs: int | None = None) -> None:
         if not path.is_file():
             return
-        with path.open("r", encoding="utf-8", errors="replace") as fh:
-            for raw in fh:
-                line = raw.rstrip("\n")
-                m = PLEX_PREFIX_RE.match(line)
-                msg = m.group(1) if m else line
-                req_m = REQ_RE.search(msg)
-                req_id = req_m.group(1) if req_m else None
-                if req_id:
-                    self.req(req_id).lines += 1
-
-                if m := self.recv_re.search(msg):
-                    req = self.req(m.group(1))
-                    req.recv += 1
-                    req.path = m.group(2)
-                    req.channel_id = m.group(3)
-                    self.counters["recv"] += 1
-                    continue
-
-                if m := self.acquire_re.search(msg):
-                    req = self.req(m.group(1))
-                    req.acquires += 1
-                    inuse = int(m.group(2))
-                    limit = int(m.group(3))
-                    self.inuse_samples.append(inuse)
-                    self.limit_samples.append(limit)
-                    self.counters["acquire"] += 1
-                    continue
-
-                if m := self.release_re.search(msg):
-                    req = self.req(m.group(1))
-                    req.releases += 1
-                    inuse = int(m.group(2))
-                    limit = int(m.group(3))
-                    self.inuse_samples.append(inuse)
-                    self.limit_samples.append(limit)
-                    dur_ms = parse_duration_ms(m.group(4))
-                    if dur_ms is not None:
-                        self.release_durations_ms.append(dur_ms)
-                    self.counters["release"] += 1
-                    continue
-
-                if m := self.reject_re.search(msg):
-                    req = self.req(m.group(1))
-                    req.tuner_reject += 1
-                    self.counters["all_tuners_in_use"] += 1
-                    continue
-
-                if m := self.ffmpeg_mode_re.search(msg):
-                    if req_id:
-                        self.req(req_id).ffmpeg_modes[m.group(1)] += 1
-
-                if m := self.first_bytes_re.search(msg):
-                    req = self.req(m.group(1))
-                    req.first_bytes_sizes.append(int(m.group(2)))
-                    d = parse_duration_ms(m.group(3))
-                    if d is not None:
-                        req.first_bytes_startup_ms.append(d)
-                        self.first_bytes_ms.append(d)
-                    self.counters["first_bytes"] += 1
-                    continue
-
-                if m := self.startup_gate_re.search(msg):
-                    req = self.req(m.group(1))
-                    row = {
-                        "buffered": int(m.group(2)),
-                        "ts_pkts": int(m.group(3)),
-                        "idr": BOOL_RE.get(m.group(4).lower(), False),
-                        "aac": BOOL_RE.get(m.group(5).lower(), False),
-                        "align": int(m.group(6)),
-                    }
-                    if m.group(7):
-                        row["release"] = m.group(7)
-                    req.startup_gate_buffered.append(row)
-                    self.counters["startup_gate_buffered"] += 1
-                    continue
-
-                if m := self.startup_gate_timeout_re.search(msg):
-                    req = self.req(m.group(1))
-                    req.startup_gate_timeout += 1
-                    self.counters["startup_gate_timeout"] += 1
-                    continue
-
-                if m := self.null_keepalive_start_re.search(msg):
-                    req = self.req(m.group(1))
-                    req.null_keepalive_starts += 1
-                    self.counters["null_keepalive_start"] += 1
-                    continue
-
-                if m := self.null_keepalive_stop_re.search(msg):
-                    req = self.req(m.group(1))
-                    reason = m.group(2)
-                    req.null_keepalive_stops[reason] += 1
-                    self.counters[f"null_keepalive_stop_{reason}"] += 1
-                    self.counters["null_keepalive_stop"] += 1
-                    continue
-
-                if m := self.bootstrap_ts_re.search(msg):
-                    req = self.req(m.group(1))
-                    req.bootstrap_ts_bytes.append(int(m.group(2)))
-                    self.counters["bootstrap_ts"] += 1
-                    continue
+        try:
+            size = path.stat().st_size
+        except OSError:
+            return
+        if size == 0:
+            return
+        if jobs is None:
+            jobs = os.cpu_count() or 1
+        if size < _PARALLEL_MIN_BYTES or jobs <= 1:
+            if size <= _WHOLE_READ_MAX_BYTES:
+                for line in path.read_bytes().splitlines():
+                    self._handle_plex_line(line)
+                return
+            with path.open("rb") as fh:
+                mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+            with mm:
+                if hasattr(mm, "madvise"):
+                    mm.madvise(mmap.MADV_SEQUENTIAL)
+                self._scan_plex_mmap(mm, 0, size)
+            return
+        with path.open("rb") as fh:
+            mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        with mm:
+            # Newline-aligned byte ranges; each worker owns whole lines.
+            bounds = [0]
+            for i in range(1, jobs):
+                nl = mm.find(b"\n", size * i // jobs)
+                b = size if nl == -1 else nl + 1
+                if b > bounds[-1]:
+                    bounds.append(b)
+            if bounds[-1] != size:
+                bounds.append(size)
+        with ProcessPoolExecutor(max_workers=len(bounds) - 1) as pool:
+            futures = [pool.submit(_scan_plex_range, str(path), s, e) for s, e in zip(bounds, bounds[1:])]
+            for fut in futures:
+                self._merge_from(fut.result())
+
+    def _handle_plex_line(self, line: bytes) -> None:
+        msg = line[_PLEX_MSG_OFFSET:] if line.startswith(_PLEX_PREFIX) else line
+        req_m = REQ_RE.search(msg)
+        if req_m is None:
+            return
+        req = self.req(req_m.group(1).decode())
+        req.lines += 1
+
+        hit = self.classifier_re.search(msg)
+        if hit is not None:
+            self._dispatch[hit.group(1)](self, msg, req)
+
+    def _h_recv(self, msg: bytes, req: ReqTrace) -> None:
+        if m := self.recv_re.search(msg):
+            req.recv += 1
+            req.path = m.group(1).decode("utf-8", "replace")
+            req.channel_id = m.group(2).decode("utf-8", "replace")
+            self.counters["recv"] += 1
+
+    def _h_acquire(self, msg: bytes, req: ReqTrace) -> None:
+        if m := self.acquire_re.search(msg):
+            req.acquires += 1
+            self.inuse_samples.append(int(m.group(1)))
+            self.limit_samples.append(int(m.group(2)))
+            self.counters["acquire"] += 1
+
+    def _h_release(self, msg: bytes, req: ReqTrace) -> None:
+        if m := self.release_re.search(msg):
+            req.releases += 1
+            self.inuse_samples.append(int(m.group(1)))
+            self.limit_samples.append(int(m.group(2)))
+            dur_ms = parse_duration_ms(m.group(3).decode("utf-8", "replace"))
+            if dur_ms is not None:
+                self.release_durations_ms.add(dur_ms)
+            self.counters["release"] += 1
+
+    def _h_reject(self, msg: bytes, req: ReqTrace) -> None:
+        req.tuner_reject += 1
+        self.counters["all_tuners_in_use"] += 1
+
+    def _h_ffmpeg_or_first_bytes(self, msg: bytes, req: ReqTrace) -> None:
+        # The ffmpeg-mode tag historically shared a line shape with
+        # first-bytes, so either classifier hit runs both checks.
+        idx = msg.find(b"ffmpeg-")
+        if idx >= 0:
+            if msg.startswith(b"ffmpeg-transcode", idx):
+                req.ffmpeg_modes["ffmpeg-transcode"] += 1
+            elif msg.startswith(b"ffmpeg-remux", idx):
+                req.ffmpeg_modes["ffmpeg-remux"] += 1
+        if b"first-bytes=" in msg and (m := self.first_bytes_re.search(msg)):
+            req.first_bytes_sizes.append(int(m.group(1)))
+            d = parse_duration_ms(m.group(2).decode("utf-8", "replace"))
+            if d is not None:
+                req.first_bytes_startup_ms.append(d)
+                self.first_bytes_ms.add(d)
+            self.counters["first_bytes"] += 1
+
+    def _h_startup_gate(self, msg: bytes, req: ReqTrace) -> None:
+        if b"startup-gate buffered=" in msg and (m := self.startup_gate_re.search(msg)):
+            req.gate_buffered.append(int(m.group(1)))
+            req.gate_ts_pkts.append(int(m.group(2)))
+            req.gate_idr.append(1 if m.group(3) == b"true" else 0)
+            req.gate_aac.append(1 if m.group(4) == b"true" else 0)
+            req.gate_align.append(int(m.group(5)))
+            self.counters["startup_gate_buffered"] += 1
+            return
+        if b"startup-gate timeout" in msg:
+            req.startup_gate_timeout += 1
+            self.counters["startup_gate_timeout"] += 1
+
+    def _h_null_keepalive(self, msg: bytes, req: ReqTrace) -> None:
+        if b"null-ts-keepalive start" in msg:
+            req.null_keepalive_starts += 1
+            self.counters["null_keepalive_start"] += 1
+            return
+        if m := self.null_keepalive_stop_re.search(msg):
+            reason = m.group(1).decode()
+            req.null_keepalive_stops[reason] += 1
+            self.counters[f"null_keepalive_stop_{reason}"] += 1
+            self.counters["null_keepalive_stop"] += 1
+
+    def _h_bootstrap_ts(self, msg: bytes, req: ReqTrace) -> None:
+        if m := self.bootstrap_ts_re.search(msg):
+            req.bootstrap_ts_bytes.append(int(m.group(1)))
+            self.counters["bootstrap_ts"] += 1
+
+    # One dict lookup on the classifier capture replaces the branch ladder
+    # that used to test every token in turn per line.
+    _dispatch = {
+        b"recv path=": _h_recv,
+        b"acquire inuse=": _h_acquire,
+        b"release inuse=": _h_release,
+        b"reject all-tuners-in-use": _h_reject,
+        b"first-bytes=": _h_ffmpeg_or_first_bytes,
+        b"ffmpeg-transcode": _h_ffmpeg_or_first_bytes,
+        b"ffmpeg-remux": _h_ffmpeg_or_first_bytes,
+        b"startup-gate": _h_startup_gate,
+        b"null-ts-keepalive": _h_null_keepalive,
+        b"bootstrap-ts bytes=": _h_bootstrap_ts,
+    }
 
     def parse_curl_log(self, path: Path) -> None:
         if not path.is_file():
@@ -232,8 +426,7 @@ class Parser:
         by_label: dict[str, dict[str, Any]] = {}
         cur: dict[str, Any] | None = None
         with path.open("r", encoding="utf-8", errors="replace") as fh:
-            for raw in fh:
-                line = raw.rstrip("\n")
+            for line in _iter_text_lines(fh):
                 if m := self.curl_start_re.match(line):
                     cur = {"label": m.group(1), "url": m.group(2), "started": m.group(3), "bytes": None}
                     self.curl_sections.append(cur)
@@ -255,41 +448,62 @@ class Parser:
                         cur["bytes"] = n
 
         # Fallback: use artifact file sizes when curl.log writes interleave.
-        for s in self.curl_sections:
-            if s.get("bytes") is not None:
-                continue
-            label = s.get("label")
-            if not label:
-                continue
-            ts_file = path.parent / f"{label}.ts"
-            if ts_file.is_file():
-                try:
-                    s["bytes"] = ts_file.stat().st_size
-                except OSError:
-                    pass
+        # One directory scan collects every .ts size instead of a stat per section.
+        if any(s.get("bytes") is None for s in self.curl_sections):
+            try:
+                sizes = {
+                    e.name: e.stat(follow_symlinks=False).st_size
+                    for e in os.scandir(path.parent)
+                    if e.name.endswith(".ts") and e.is_file(follow_symlinks=False)
+                }
+            except OSError:
+                sizes = {}
+            for s in self.curl_sections:
+                if s.get("bytes") is None and (label := s.get("label")):
+                    s["bytes"] = sizes.get(f"{label}.ts")
 
     def parse_pms_logs(self, root: Path) -> None:
         if not root.is_dir():
             return
-        for p in root.rglob("*"):
-            if not p.is_file():
-                continue
+        for entry in _iter_files(root):
             # PMS logs are plain text; skip large binaries by extension heuristics.
-            if p.suffix.lower() in {".zip", ".db", ".sqlite", ".pcap"}:
+            ext = entry.name.rpartition(".")[2].lower() if "." in entry.name else ""
+            if ext in {"zip", "db", "sqlite", "pcap"}:
                 continue
             try:
-                with p.open("r", encoding="utf-8", errors="replace") as fh:
-                    for raw in fh:
-                        line = raw.rstrip("\n")
-                        for key, rx in self.pms_patterns.items():
-                            if rx.search(line):
-                                self.pms_counts[key] += 1
-                                if len(self.pms_samples[key]) < 8:
-                                    self.pms_samples[key].append(f"{p.name}: {line}")
-                        if m := self.pms_session_id_re.search(line):
-                            self.pms_session_ids[m.group(1)] += 1
+                with open(entry.path, "rb") as fh:
+                    try:
+                        mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+                    except ValueError:  # empty file
+                        continue
+                    with mm:
+                        # Search the buffer in place; every pattern and the
+                        # session-id scan require one of the needles, so only
+                        # the matching line spans ever get decoded.
+                        spans: set[tuple[int, int]] = set()
+                        for rx in _PMS_NEEDLE_RES:
+                            for m in rx.finditer(mm):
+                                start = mm.rfind(b"\n", 0, m.start()) + 1
+                                end = mm.find(b"\n", m.end())
+                                spans.add((start, end if end != -1 else mm.size()))
+                        if not spans:
+                            continue
+                        lines = [mm[s:e].decode("utf-8", "replace") for s, e in sorted(spans)]
             except OSError:
                 continue
+            sample_prefix = entry.name + ": "
+            for line in lines:
+                line_lower = line.lower()
+                for key, rx, needle in self._pms_pattern_list:
+                    if needle in line_lower and rx.search(line):
+                        # Counts accumulate for every match; the sample string
+                        # is only built while the per-key cap has room.
+                        self.pms_counts[key] += 1
+                        samples = self.pms_samples.setdefault(key, [])
+                        if len(samples) < 8:
+                            samples.append(sample_prefix + line)
+                if "/livetv/sessions/" in line and (m := self.pms_session_id_re.search(line)):
+                    self.pms_session_ids[m.group(1)] += 1
 
     def parse_plex_web_probe(self, out_dir: Path) -> None:
         json_path = out_dir / "plex-web-probe.json"
@@ -363,11 +577,11 @@ class Parser:
                     "releases": r.releases,
                     "tuner_reject": r.tuner_reject,
                     "startup_gate_timeout": r.startup_gate_timeout,
-                    "startup_gate_buffered_count": len(r.startup_gate_buffered),
+                    "startup_gate_buffered_count": len(r.gate_ts_pkts),
                     "startup_gate_good_like_count": sum(
                         1
-                        for e in r.startup_gate_buffered
-                        if e.get("idr") and e.get("aac") and int(e.get("ts_pkts", 0)) >= 8
+                        for idr, aac, pkts in zip(r.gate_idr, r.gate_aac, r.gate_ts_pkts)
+                        if idr and aac and pkts >= 8
                     ),
                     "null_keepalive_starts": r.null_keepalive_starts,
                     "null_keepalive_stops": dict(r.null_keepalive_stops),
@@ -400,8 +614,8 @@ class Parser:
                 for k, v in self.counters.items()
                 if k.startswith("null_keepalive_stop_")
             },
-            "first_bytes_ms_stats": stats(self.first_bytes_ms),
-            "release_duration_ms_stats": stats(self.release_durations_ms),
+            "first_bytes_ms_stats": self.first_bytes_ms.summary(),
+            "release_duration_ms_stats": self.release_durations_ms.summary(),
             "max_inuse_seen": max(self.inuse_samples) if self.inuse_samples else None,
             "limit_seen": max(self.limit_samples) if self.limit_samples else None,
             "pms_counts": {k: int(v) for k, v in self.pms_counts.items()},
@@ -442,6 +656,16 @@ class Parser:
         return report
 
 
+def _scan_plex_range(path_str: str, start: int, end: int) -> Parser:
+    """Worker: parse one newline-aligned byte range into a fresh Parser."""
+    p = Parser()
+    with open(path_str, "rb") as fh:
+        mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+    with mm:
+        p._scan_plex_mmap(mm, start, end)
+    return p
+
+
 def write_text_report(report: dict[str, Any], out_path: Path) -> None:
     syn = report["synopsis"]
     lines: list[str] = []
@@ -571,7 +795,11 @@ def main() -> int:
     report = parser.build_report(out_dir)
     json_path = out_dir / "report.json"
     txt_path = out_dir / "report.txt"
-    json_path.write_text(json.dumps(report, indent=2, sort_keys=True), encoding="utf-8")
+    if orjson is not None:
+        # default=list covers the Counter.most_common tuples.
+        json_path.write_bytes(orjson.dumps(report, option=orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS, default=list))
+    else:
+        json_path.write_text(json.dumps(report, indent=2, sort_keys=True), encoding="utf-8")
     write_text_report(report, txt_path)
 
     if args.print_report:
@@ -14,17 +14,28 @@ JSON maps for channels that match criteria likely to cause Plex Web trouble
 from __future__ import annotations
 
 import argparse
+import hashlib
 import json
 import math
 import os
+import signal
 import subprocess
 import sys
+import tempfile
 import time
 import urllib.parse
 import urllib.request
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
 from typing import Any
 
+try:
+    import orjson
+except ImportError:  # stdlib json fallback; orjson is optional
+    orjson = None
+
 
 VIDEO_FRIENDLY = {"h264", "avc", "mpeg2video", "mpeg4"}
 AUDIO_FRIENDLY = {"aac", "ac3", "eac3", "mp3", "mp2"}
@@ -38,12 +49,30 @@ class ChannelRow:
     url: str
 
 
+def _loads(data: bytes | str) -> Any:
+    # orjson parses ffprobe/lineup payloads straight from bytes, skipping the
+    # intermediate decode; stdlib json handles both types as well.
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _write_json(path: str, obj: Any) -> None:
+    if orjson is not None:
+        with open(path, "wb") as f:
+            f.write(orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS) + b"\n")
+        return
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(obj, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
 def load_json(source: str) -> Any:
     if source.startswith(("http://", "https://")):
         with urllib.request.urlopen(source, timeout=20) as resp:
-            return json.loads(resp.read().decode("utf-8", "replace"))
-    with open(source, "r", encoding="utf-8") as f:
-        return json.load(f)
+            return _loads(resp.read())
+    with open(source, "rb") as f:
+        return _loads(f.read())
 
 
 def absolutize_url(base: str, url: str) -> str:
@@ -54,6 +83,7 @@ def absolutize_url(base: str, url: str) -> str:
     return urllib.parse.urljoin(base.rstrip("/") + "/", url.lstrip("/"))
 
 
+@lru_cache(maxsize=4096)
 def channel_id_from_url(url: str) -> str:
     path = urllib.parse.urlparse(url).path
     if "/stream/" in path:
@@ -91,35 +121,118 @@ def apply_url_rewrites(url: str, rewrites: list[tuple[str, str]]) -> str:
     return url
 
 
-def ffprobe_json(url: str, timeout_s: int) -> dict[str, Any]:
+def ffprobe_json(
+    url: str,
+    timeout_s: int,
+    probesize: int = 262144,
+    analyzeduration_us: int = 500000,
+    fast_probe: bool = False,
+) -> dict[str, Any]:
+    # probesize/analyzeduration bound how much of the stream ffprobe inspects;
+    # the defaults are enough for codec/fps/field_order and exit far faster
+    # than the old -read_intervals %+4 (which still read 4s of payload).
     cmd = [
         "ffprobe",
         "-v",
         "error",
         "-rw_timeout",
         "15000000",
-        "-read_intervals",
-        "%+4",
+        "-probesize",
+        str(probesize),
+        "-analyzeduration",
+        str(analyzeduration_us),
+        "-fflags",
+        "nobuffer",
+    ]
+    if fast_probe:
+        # Skips the stream-analysis pass entirely; field_order/level may be
+        # missing, acceptable when only codecs matter.
+        cmd.append("-nofind_stream_info")
+    cmd += [
         "-show_streams",
         "-show_format",
         "-of",
         "json",
         url,
     ]
-    cp = subprocess.run(
+    # ffprobe can wedge on HTTP streams even with -rw_timeout, so run it in
+    # its own process group and kill the whole group on timeout; a plain
+    # proc.kill() can leave forked helpers holding the pipe open.
+    proc = subprocess.Popen(
         cmd,
-        capture_output=True,
-        text=True,
-        timeout=timeout_s,
-        errors="replace",
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        start_new_session=True,
     )
-    if cp.returncode != 0:
-        msg = (cp.stderr or cp.stdout or "").strip()
-        raise RuntimeError(msg or f"ffprobe exit {cp.returncode}")
-    return json.loads(cp.stdout or "{}")
+    try:
+        out, err = proc.communicate(timeout=timeout_s)
+    except subprocess.TimeoutExpired:
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except OSError:
+            proc.kill()
+        proc.wait()
+        raise RuntimeError(f"ffprobe timeout after {timeout_s}s")
+    if proc.returncode != 0:
+        msg = (err or out or b"").decode("utf-8", "replace").strip()
+        raise RuntimeError(msg or f"ffprobe exit {proc.returncode}")
+    return _loads(out or b"{}")
+
+
+_FFPROBE_CACHE_DIR = Path.home() / ".cache" / "iptvtunerr" / "ffprobe"
+
+
+def _ffprobe_cache_read(sha: str, ttl_s: int) -> dict[str, Any] | None:
+    try:
+        entry = json.loads((_FFPROBE_CACHE_DIR / f"{sha}.json").read_text())
+        if time.time() - float(entry["ts"]) < ttl_s:
+            return entry["data"]
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    return None
 
 
+def _ffprobe_cache_write(sha: str, data: dict[str, Any]) -> None:
+    # Temp file + rename so concurrent probes never observe a partial entry.
+    try:
+        _FFPROBE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=_FFPROBE_CACHE_DIR, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump({"ts": time.time(), "data": data}, f)
+        os.replace(tmp, _FFPROBE_CACHE_DIR / f"{sha}.json")
+    except OSError:
+        pass
+
+
+@lru_cache(maxsize=512)
+def cached_ffprobe(
+    url: str,
+    timeout_s: int,
+    ttl_s: int,
+    probesize: int = 262144,
+    analyzeduration_us: int = 500000,
+    fast_probe: bool = False,
+) -> dict[str, Any]:
+    """ffprobe_json behind an in-process memo (aliased lineup URLs recur) and
+    an on-disk cache keyed by stream URL, so warm re-runs skip the subprocess
+    entirely. ttl_s <= 0 disables the disk layer; failed probes raise before
+    anything is written, so only good payloads are cached."""
+    sha = ""
+    if ttl_s > 0:
+        key = f"{url}|{probesize}|{analyzeduration_us}|{fast_probe}"
+        sha = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        cached = _ffprobe_cache_read(sha, ttl_s)
+        if cached is not None:
+            return cached
+    data = ffprobe_json(url, timeout_s, probesize, analyzeduration_us, fast_probe)
+    if ttl_s > 0:
+        _ffprobe_cache_write(sha, data)
+    return data
+
+
+@lru_cache(maxsize=256)
 def _fps_from_ratio(v: str) -> float:
+    # Pure parse; the same ratio string recurs across a provider's channels.
     try:
         num, den = v.split("/", 1)
         num_f = float(num)
@@ -131,11 +244,22 @@ def _fps_from_ratio(v: str) -> float:
         return 0.0
 
 
-def classify_probe(data: dict[str, Any], bitrate_threshold: int) -> tuple[dict[str, Any], list[str], str]:
-    streams = data.get("streams") or []
+def classify_probe(
+    data: dict[str, Any], bitrate_threshold: int
+) -> tuple[dict[str, Any], list[str], str]:
     fmt = data.get("format") or {}
-    video = next((s for s in streams if s.get("codec_type") == "video"), {})
-    audio = next((s for s in streams if s.get("codec_type") == "audio"), {})
+    # First video and first audio stream in one pass; mosaic/multi-audio
+    # channels can carry 10+ streams.
+    video: dict[str, Any] = {}
+    audio: dict[str, Any] = {}
+    for stream in data.get("streams") or ():
+        kind = stream.get("codec_type")
+        if kind == "video" and not video:
+            video = stream
+        elif kind == "audio" and not audio:
+            audio = stream
+        if video and audio:
+            break
     vcodec = str(video.get("codec_name") or "").lower()
     acodec = str(audio.get("codec_name") or "").lower()
     aprofile = str(audio.get("profile") or "")
@@ -148,6 +272,19 @@ def classify_probe(data: dict[str, Any], bitrate_threshold: int) -> tuple[dict[s
     bitrate = int(fmt.get("bit_rate") or video.get("bit_rate") or audio.get("bit_rate") or 0)
     has_b_frames = int(video.get("has_b_frames") or 0)
 
+    summary = {
+        "video_codec": vcodec,
+        "video_profile": vprofile,
+        "width": width,
+        "height": height,
+        "fps": round(fps, 3),
+        "field_order": field_order,
+        "h264_level": level,
+        "audio_codec": acodec,
+        "audio_profile": aprofile,
+        "bit_rate": bitrate,
+    }
+
     reasons: list[str] = []
     if vcodec and vcodec not in VIDEO_FRIENDLY:
         reasons.append(f"video_codec={vcodec}")
@@ -179,18 +316,6 @@ def classify_probe(data: dict[str, Any], bitrate_threshold: int) -> tuple[dict[s
     else:
         profile = ""
 
-    summary = {
-        "video_codec": vcodec,
-        "video_profile": vprofile,
-        "width": width,
-        "height": height,
-        "fps": round(fps, 3),
-        "field_order": field_order,
-        "h264_level": level,
-        "audio_codec": acodec,
-        "audio_profile": aprofile,
-        "bit_rate": bitrate,
-    }
     return summary, reasons, profile
 
 
@@ -207,11 +332,17 @@ def main() -> int:
     ap.add_argument("--channel-id", action="append", default=[], help="Only probe specific channel ID(s)")
     ap.add_argument("--limit", type=int, default=0, help="Probe at most N channels")
     ap.add_argument("--timeout", type=int, default=12, help="ffprobe timeout seconds per channel")
+    ap.add_argument("--probesize", type=int, default=262144, help="ffprobe -probesize bytes")
+    ap.add_argument("--analyzeduration", type=int, default=500000, help="ffprobe -analyzeduration microseconds")
+    ap.add_argument("--fast-probe", action="store_true", help="Skip ffprobe stream analysis (-nofind_stream_info); some fields may be absent")
+    ap.add_argument("--ffprobe-cache-ttl", type=int, default=86400, help="Reuse on-disk ffprobe results younger than this (seconds)")
+    ap.add_argument("--no-ffprobe-cache", action="store_true", help="Bypass the on-disk ffprobe cache")
     ap.add_argument("--bitrate-threshold", type=int, default=5_000_000, help="Flag bitrate above this bps")
     ap.add_argument("--emit-profile-overrides", help="Write profile overrides JSON to this path")
     ap.add_argument("--emit-transcode-overrides", help="Write transcode overrides JSON to this path")
     ap.add_argument("--no-transcode-overrides", action="store_true", help="Do not emit transcode=true for flagged channels")
-    ap.add_argument("--sleep-ms", type=int, default=0, help="Sleep between probes (ms)")
+    ap.add_argument("--workers", type=int, default=8, help="Parallel ffprobe workers (1 = serial)")
+    ap.add_argument("--sleep-ms", type=int, default=0, help="Sleep between probes (ms); serial mode only")
     args = ap.parse_args()
 
     lineup_raw = load_json(args.lineup_json)
@@ -241,8 +372,9 @@ def main() -> int:
     transcode_overrides: dict[str, bool] = {}
     report: list[dict[str, Any]] = []
 
-    print(f"PROBE_START channels={len(rows)}", flush=True)
-    for idx, row in enumerate(rows, start=1):
+    cache_ttl_s = 0 if args.no_ffprobe_cache else args.ffprobe_cache_ttl
+
+    def probe_one(row: ChannelRow) -> tuple[dict[str, Any], float]:
         started = time.time()
         item: dict[str, Any] = {
             "id": row.id,
@@ -251,42 +383,67 @@ def main() -> int:
             "url": row.url,
         }
         try:
-            data = ffprobe_json(row.url, timeout_s=args.timeout)
+            data = cached_ffprobe(
+                row.url, args.timeout, cache_ttl_s, args.probesize, args.analyzeduration, args.fast_probe
+            )
             summary, reasons, profile = classify_probe(data, args.bitrate_threshold)
             item.update(summary)
             item["reasons"] = reasons
             item["suggest_profile"] = profile
             item["ok"] = True
+        except Exception as e:
+            item["ok"] = False
+            item["error"] = str(e)
+        return item, time.time() - started
+
+    def consume(seq: int, row: ChannelRow, item: dict[str, Any], dur_s: float) -> None:
+        if item["ok"]:
+            profile = item["suggest_profile"]
+            reasons = item["reasons"]
             if profile:
                 profile_overrides[row.id] = profile
                 if not args.no_transcode_overrides:
                     transcode_overrides[row.id] = True
             status = "FLAG" if reasons else "OK"
             print(
-                f"{status} {idx}/{len(rows)} id={row.id} guide={row.guide} "
-                f"v={summary['video_codec']} {summary['width']}x{summary['height']}@{summary['fps']} "
-                f"a={summary['audio_codec']} bitrate={summary['bit_rate']} "
+                f"{status} {seq}/{len(rows)} id={row.id} guide={row.guide} "
+                f"v={item['video_codec']} {item['width']}x{item['height']}@{item['fps']} "
+                f"a={item['audio_codec']} bitrate={item['bit_rate']} "
                 f"profile={profile or '-'} reasons={','.join(reasons) if reasons else '-'} "
-                f"dur={time.time()-started:.1f}s",
+                f"dur={dur_s:.1f}s",
                 flush=True,
             )
-        except Exception as e:
-            item["ok"] = False
-            item["error"] = str(e)
-            print(f"ERR {idx}/{len(rows)} id={row.id} guide={row.guide} err={e}", flush=True)
-        report.append(item)
-        if args.sleep_ms > 0 and idx < len(rows):
-            time.sleep(args.sleep_ms / 1000.0)
+        else:
+            print(f"ERR {seq}/{len(rows)} id={row.id} guide={row.guide} err={item['error']}", flush=True)
+
+    workers = max(1, args.workers)
+    print(f"PROBE_START channels={len(rows)} workers={workers}", flush=True)
+    if workers == 1 or len(rows) <= 1:
+        for idx, row in enumerate(rows, start=1):
+            item, dur_s = probe_one(row)
+            consume(idx, row, item, dur_s)
+            report.append(item)
+            if args.sleep_ms > 0 and idx < len(rows):
+                time.sleep(args.sleep_ms / 1000.0)
+    else:
+        # Probes run concurrently; progress prints in completion order while
+        # the report keeps lineup order. Overrides/report are only mutated
+        # here on the consuming thread, so no lock is needed.
+        results: list[dict[str, Any] | None] = [None] * len(rows)
+        with ThreadPoolExecutor(max_workers=workers) as ex:
+            futs = {ex.submit(probe_one, row): i for i, row in enumerate(rows)}
+            for seq, fut in enumerate(as_completed(futs), start=1):
+                i = futs[fut]
+                item, dur_s = fut.result()
+                consume(seq, rows[i], item, dur_s)
+                results[i] = item
+        report.extend(r for r in results if r is not None)
 
     if args.emit_profile_overrides:
-        with open(args.emit_profile_overrides, "w", encoding="utf-8") as f:
-            json.dump(profile_overrides, f, indent=2, sort_keys=True)
-            f.write("\n")
+        _write_json(args.emit_profile_overrides, profile_overrides)
         print(f"WROTE profile_overrides={args.emit_profile_overrides} entries={len(profile_overrides)}")
     if args.emit_transcode_overrides:
-        with open(args.emit_transcode_overrides, "w", encoding="utf-8") as f:
-            json.dump(transcode_overrides, f, indent=2, sort_keys=True)
-            f.write("\n")
+        _write_json(args.emit_transcode_overrides, transcode_overrides)
         print(f"WROTE transcode_overrides={args.emit_transcode_overrides} entries={len(transcode_overrides)}")
 
     flagged = sum(1 for r in report if r.get("reasons"))
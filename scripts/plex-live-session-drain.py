@@ -0,0 +1,426 @@
+#!/usr/bin/env python3
+"""
+Drain stale Plex Live TV sessions that keep tuners allocated after playback ends.
+
+Purpose:
+- Plex can retain hidden active Live TV grabs (`Waiting for media grab to start`)
+  even when no client is actually watching; the tuner stays allocated until the
+  session is stopped server-side.
+- The built-in reaper (IPTV_TUNERR_PLEX_SESSION_REAPER) handles this at runtime;
+  this is the external equivalent for operators pointing at an arbitrary PMS,
+  e.g. during incident recovery or k3s cutover validation.
+
+Modes:
+- One-shot (default): stop every matching live session, then poll
+  `/status/sessions` until they are gone or --deadline expires.
+- `--watch`: poll continuously, correlate sessions against PMS request logs
+  (`--pms-log-cmd`, e.g. a kubectl logs invocation) and stop sessions whose
+  player has produced no matching request for --idle-grace seconds.
+
+Stopping uses `/video/:/transcode/universal/stop?session=<id>`, the same call
+the in-process reaper issues; sessions without a transcode are reported but
+left alone.
+"""
+
+from __future__ import annotations
+
+import argparse
+import http.client
+import random
+import re
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+import urllib.request
+import xml.etree.ElementTree as ET
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+
+# PMS request-log lines carry the client address in brackets followed by the
+# request line, e.g.:  ... [10.0.0.17:51234] GET /livetv/sessions/abc/index.m3u8
+_REQ_RE = re.compile(r"\[(?P<ip>[0-9a-fA-F.:]+?)(?::\d+)?\]\s+(?:GET|POST|PUT|DELETE)\s+(?P<path>\S+)")
+
+# Endpoints any active player keeps touching even when its live path is quiet.
+_GENERIC_ACTIVITY_PREFIXES = ("/:/timeline", "/video/:/transcode/universal/ping")
+
+# SSE event names that should kick the poll loop awake.
+_KICK_EVENTS = frozenset({b"playing", b"activity", b"timeline"})
+
+
+@dataclass
+class SessionRow:
+    live_key: str
+    session_id: str = ""
+    transcode_id: str = ""
+    player_ip: str = ""
+    player_product: str = ""
+    player_state: str = ""
+    machine_id: str = ""
+    title: str = ""
+    last_active: float = field(default=0.0)
+
+    @property
+    def live_path_fragment(self) -> str:
+        # "/livetv/sessions/<uuid>" prefixes every segment/playlist request
+        # the session generates.
+        return self.live_key.rsplit("/index.m3u8", 1)[0] if self.live_key else ""
+
+
+@lru_cache(maxsize=4)
+def _token_qs(token: str) -> str:
+    # The token never changes within a run; encode it once instead of on
+    # every poll of the watch loop.
+    return urllib.parse.urlencode({"X-Plex-Token": token})
+
+
+# One keep-alive connection per (scheme, netloc), reused across every poll so
+# watch mode pays TCP/TLS setup once instead of per iteration. The poll loop
+# is single-threaded; the SSE reader keeps its own streaming connection.
+_conns: dict[tuple[str, str], http.client.HTTPConnection] = {}
+
+
+def _http_conn(base: str) -> http.client.HTTPConnection:
+    u = urllib.parse.urlsplit(base)
+    key = (u.scheme, u.netloc)
+    conn = _conns.get(key)
+    if conn is None:
+        cls = http.client.HTTPSConnection if u.scheme == "https" else http.client.HTTPConnection
+        conn = cls(u.netloc, timeout=10)
+        _conns[key] = conn
+    return conn
+
+
+def _plex_request(method: str, base: str, token: str, path: str) -> tuple[int, bytes]:
+    u = urllib.parse.urlsplit(base)
+    sep = "&" if "?" in path else "?"
+    target = f"{u.path.rstrip('/')}{path}{sep}{_token_qs(token)}"
+    headers = {"Accept": "application/xml", "User-Agent": "IptvTunerr/1.0"}
+    # One retry on a fresh connection covers the server having closed an idle
+    # keep-alive socket between polls.
+    for attempt in (0, 1):
+        conn = _http_conn(base)
+        try:
+            conn.request(method, target, body=b"" if method == "PUT" else None, headers=headers)
+            resp = conn.getresponse()
+            return resp.status, resp.read()
+        except (http.client.HTTPException, OSError):
+            conn.close()
+            _conns.pop((u.scheme, u.netloc), None)
+            if attempt:
+                raise
+    raise OSError("unreachable")
+
+
+def plex_get(base: str, token: str, path: str) -> ET.Element:
+    status, data = _plex_request("GET", base, token, path)
+    if status != 200:
+        raise OSError(f"{path} status={status}")
+    return ET.fromstring(data)
+
+
+def plex_put(base: str, token: str, path: str) -> int:
+    status, _ = _plex_request("PUT", base, token, path)
+    return status
+
+
+def parse_rows(root: ET.Element) -> list[SessionRow]:
+    rows: list[SessionRow] = []
+    for video in root.iter("Video"):
+        key = (video.attrib.get("key") or "").strip()
+        if not key.startswith("/livetv/sessions/"):
+            continue
+        row = SessionRow(live_key=key, title=video.attrib.get("title") or "")
+        player = video.find("Player")
+        if player is not None:
+            row.player_ip = player.attrib.get("address") or ""
+            row.player_product = player.attrib.get("product") or ""
+            row.player_state = player.attrib.get("state") or ""
+            row.machine_id = player.attrib.get("machineIdentifier") or ""
+        session = video.find("Session")
+        if session is not None:
+            row.session_id = session.attrib.get("id") or ""
+        ts = video.find("TranscodeSession")
+        if ts is not None:
+            ts_key = ts.attrib.get("key") or ""
+            if "/transcode/sessions/" in ts_key:
+                row.transcode_id = ts_key.rsplit("/", 1)[-1]
+        rows.append(row)
+    return rows
+
+
+def matches(base: str, token: str, player_ip: str, machine_id: str) -> list[SessionRow]:
+    root = plex_get(base, token, "/status/sessions")
+    rows = parse_rows(root)
+    if player_ip:
+        rows = [r for r in rows if r.player_ip == player_ip]
+    if machine_id:
+        rows = [r for r in rows if r.machine_id == machine_id]
+    return rows
+
+
+def fetch_pms_logs(cmd_template: str, since_s: int) -> str:
+    cmd = cmd_template.format(since=since_s)
+    try:
+        cp = subprocess.run(cmd, shell=True, capture_output=True, text=True, errors="replace", timeout=30)
+    except subprocess.TimeoutExpired:
+        return ""
+    return cp.stdout or ""
+
+
+class LogTail:
+    """One long-lived log follower (e.g. `kubectl logs -f`): a reader thread
+    buffers timestamped lines so each poll slices a recent window out of
+    memory instead of paying kubectl's client startup per iteration."""
+
+    def __init__(self, cmd: str, keep_s: float) -> None:
+        self.keep_s = keep_s
+        self._buf: deque[tuple[float, str]] = deque()
+        self._lock = threading.Lock()
+        self.proc = subprocess.Popen(
+            cmd,
+            shell=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            errors="replace",
+            bufsize=1,
+        )
+        threading.Thread(target=self._reader, daemon=True).start()
+
+    def _reader(self) -> None:
+        assert self.proc.stdout is not None
+        for line in self.proc.stdout:
+            now = time.monotonic()
+            with self._lock:
+                self._buf.append((now, line))
+                cutoff = now - self.keep_s
+                while self._buf and self._buf[0][0] < cutoff:
+                    self._buf.popleft()
+
+    def snapshot(self, window_s: float) -> str:
+        cutoff = time.monotonic() - window_s
+        with self._lock:
+            return "".join(line for ts, line in self._buf if ts >= cutoff)
+
+    def close(self) -> None:
+        if self.proc.poll() is None:
+            self.proc.terminate()
+
+
+def index_logs(logs_text: str) -> tuple[str, set[str]]:
+    """One regex pass over the log window: request paths joined into a single
+    haystack, plus the set of IPs seen hitting generic keep-alive endpoints.
+    Every per-row check afterwards is a substring or set-membership test, so a
+    poll costs O(lines + rows) instead of O(lines * rows)."""
+    paths: list[str] = []
+    generic_ips: set[str] = set()
+    for m in _REQ_RE.finditer(logs_text):
+        path = m.group("path")
+        paths.append(path)
+        # Generic endpoints carry no session marker; remember who touched them.
+        if path.startswith(_GENERIC_ACTIVITY_PREFIXES):
+            generic_ips.add(m.group("ip"))
+    return "\n".join(paths), generic_ips
+
+
+def row_activity_hit(row: SessionRow, all_paths: str, generic_ips: set[str]) -> bool:
+    """True if the indexed log window shows any request attributable to this
+    session. Session markers contain no newline, so the joined haystack cannot
+    produce a match spanning two paths."""
+    frag = row.live_path_fragment
+    if frag and frag in all_paths:
+        return True
+    if row.transcode_id and row.transcode_id in all_paths:
+        return True
+    if row.session_id and row.session_id in all_paths:
+        return True
+    return bool(row.player_ip) and row.player_ip in generic_ips
+
+
+def stop_row(base: str, token: str, row: SessionRow, dry_run: bool) -> str:
+    if not row.transcode_id:
+        return "no-transcode"
+    if dry_run:
+        return "dry-run"
+    qs = urllib.parse.urlencode({"session": row.transcode_id})
+    code = plex_put(base, token, f"/video/:/transcode/universal/stop?{qs}")
+    return f"status={code}"
+
+
+def sse_notifications(base: str, token: str, stop_evt: threading.Event, kick_evt: threading.Event) -> None:
+    """Background reader of PMS server-sent events; kicks the poll loop early
+    whenever playback state changes instead of waiting out --poll."""
+    url = f"{base.rstrip('/')}/:/eventsource/notifications?{_token_qs(token)}"
+    req = urllib.request.Request(url, headers={"Accept": "text/event-stream", "User-Agent": "IptvTunerr/1.0"})
+    backoff = 1.0
+    while not stop_evt.is_set():
+        try:
+            with urllib.request.urlopen(req, timeout=30) as resp:
+                while not stop_evt.is_set():
+                    raw = resp.readline()
+                    if not raw:
+                        break
+                    # A live stream resets the reconnect backoff.
+                    backoff = 1.0
+                    # Stay in bytes: only the event-name slice matters, so no
+                    # per-line decode on a stream that can emit dozens/sec.
+                    raw = raw.rstrip(b"\r\n")
+                    if raw.startswith(b"event:") and raw[6:].strip() in _KICK_EVENTS:
+                        kick_evt.set()
+        except OSError:
+            pass
+        if not stop_evt.is_set():
+            # Jittered exponential backoff so a flapping PMS is not hammered
+            # with reconnects at a fixed cadence.
+            time.sleep(backoff + random.uniform(0, 0.5 * backoff))
+            backoff = min(30.0, backoff * 2)
+
+
+def idle_annotate(
+    rows: list[SessionRow],
+    logs_text: str,
+    last_seen: dict[str, float],
+    now: float,
+) -> None:
+    """Update per-session last-activity timestamps from the current log window."""
+    all_paths, generic_ips = index_logs(logs_text) if logs_text else ("", set())
+    for row in rows:
+        key = row.live_key
+        if key not in last_seen:
+            last_seen[key] = now
+        if logs_text and row_activity_hit(row, all_paths, generic_ips):
+            last_seen[key] = now
+        row.last_active = last_seen[key]
+
+
+def describe(row: SessionRow) -> str:
+    return (
+        f"live={row.live_key} session={row.session_id or '-'} transcode={row.transcode_id or '-'} "
+        f"ip={row.player_ip or '-'} product={row.player_product or '-'} state={row.player_state or '-'} "
+        f"title={row.title!r}"
+    )
+
+
+def watch_loop(args: argparse.Namespace, stop_evt: threading.Event, kick_evt: threading.Event) -> int:
+    last_seen: dict[str, float] = {}
+    # A one-worker executor keeps exactly one log fetch in flight so the
+    # kubectl startup cost (config parse, TLS to the API server) overlaps the
+    # session poll and the inter-poll sleep instead of serializing with them.
+    tail = LogTail(args.pms_log_follow_cmd, max(args.log_lookback * 4, 60)) if args.pms_log_follow_cmd else None
+    log_ex = ThreadPoolExecutor(max_workers=1) if args.pms_log_cmd and tail is None else None
+    logs_future = log_ex.submit(fetch_pms_logs, args.pms_log_cmd, args.log_lookback) if log_ex else None
+    has_logs = tail is not None or log_ex is not None
+    try:
+        while not stop_evt.is_set():
+            kick_evt.clear()
+            now = time.time()
+            try:
+                rows = matches(args.pms_url, args.token, args.player_ip, args.machine_id)
+            except OSError as e:
+                print(f"WARN sessions fetch failed: {e}", file=sys.stderr, flush=True)
+                kick_evt.wait(timeout=max(0.1, args.poll))
+                continue
+            if tail is not None:
+                logs_text = tail.snapshot(args.log_lookback)
+            elif logs_future is not None:
+                logs_text = logs_future.result()
+                logs_future = log_ex.submit(fetch_pms_logs, args.pms_log_cmd, args.log_lookback)
+            else:
+                logs_text = ""
+            idle_annotate(rows, logs_text, last_seen, now)
+            active_keys = {r.live_key for r in rows}
+            for k in list(last_seen):
+                if k not in active_keys:
+                    del last_seen[k]
+            for row in rows:
+                idle_s = now - row.last_active
+                if has_logs and idle_s >= args.idle_grace:
+                    result = stop_row(args.pms_url, args.token, row, args.dry_run)
+                    print(f"STOP idle={idle_s:.0f}s {describe(row)} -> {result}", flush=True)
+                else:
+                    print(f"LIVE idle={idle_s:.0f}s {describe(row)}", flush=True)
+            kick_evt.wait(timeout=max(0.1, args.poll))
+    finally:
+        if tail is not None:
+            tail.close()
+        if log_ex is not None:
+            log_ex.shutdown(wait=False, cancel_futures=True)
+    return 0
+
+
+def drain_once(args: argparse.Namespace, kick_evt: threading.Event) -> int:
+    rows = matches(args.pms_url, args.token, args.player_ip, args.machine_id)
+    if not rows:
+        print("DRAIN_DONE sessions=0", flush=True)
+        return 0
+    for row in rows:
+        result = stop_row(args.pms_url, args.token, row, args.dry_run)
+        print(f"STOP {describe(row)} -> {result}", flush=True)
+    if args.dry_run:
+        return 0
+    deadline = time.time() + args.deadline
+    remain = rows
+    while time.time() < deadline:
+        kick_evt.clear()
+        remain = matches(args.pms_url, args.token, args.player_ip, args.machine_id)
+        if not remain:
+            print("DRAIN_DONE sessions=0", flush=True)
+            return 0
+        # An SSE stop notification wakes this immediately; otherwise fall back
+        # to the poll cadence, same as the watch loop.
+        kick_evt.wait(timeout=max(0.1, args.poll))
+    print(f"DRAIN_TIMEOUT sessions={len(remain)}", file=sys.stderr, flush=True)
+    return 1
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Stop stale Plex Live TV sessions")
+    ap.add_argument("--pms-url", required=True, help="PMS base URL, e.g. http://127.0.0.1:32400")
+    ap.add_argument("--token", default="", help="X-Plex-Token (owner)")
+    ap.add_argument("--player-ip", default="", help="Only consider sessions from this player address")
+    ap.add_argument("--machine-id", default="", help="Only consider sessions from this client machineIdentifier")
+    ap.add_argument("--poll", type=float, default=2.0, help="Seconds between session polls")
+    ap.add_argument("--deadline", type=float, default=30.0, help="One-shot mode: give up after this many seconds")
+    ap.add_argument("--watch", action="store_true", help="Poll continuously and stop idle sessions")
+    ap.add_argument("--idle-grace", type=float, default=20.0, help="Watch mode: stop sessions idle longer than this")
+    ap.add_argument("--log-lookback", type=int, default=30, help="Seconds of PMS logs to correlate per poll")
+    ap.add_argument(
+        "--pms-log-cmd",
+        default="",
+        help="Shell command printing recent PMS request logs; '{since}' expands to --log-lookback "
+        "(e.g. 'kubectl -n plex logs deploy/pms --since={since}s')",
+    )
+    ap.add_argument(
+        "--pms-log-follow-cmd",
+        default="",
+        help="Long-lived follower command (e.g. 'kubectl -n plex logs deploy/pms -f') spawned once "
+        "at watch start; takes precedence over --pms-log-cmd",
+    )
+    ap.add_argument("--dry-run", action="store_true", help="Report what would be stopped without stopping")
+    args = ap.parse_args()
+
+    stop_evt = threading.Event()
+    kick_evt = threading.Event()
+    sse = threading.Thread(
+        target=sse_notifications,
+        args=(args.pms_url, args.token, stop_evt, kick_evt),
+        daemon=True,
+    )
+    sse.start()
+    try:
+        if args.watch:
+            return watch_loop(args, stop_evt, kick_evt)
+        return drain_once(args, kick_evt)
+    except KeyboardInterrupt:
+        return 130
+    finally:
+        stop_evt.set()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -29,6 +29,7 @@ from __future__ import annotations
 
 import argparse
 import gzip
+import hashlib
 import http.client
 import http.server
 import io
@@ -40,13 +41,41 @@ import sys
 import threading
 import time
 import urllib.parse
-import xml.etree.ElementTree as ET
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
+
+try:
+    from lxml import etree as ET  # type: ignore[import-not-found]
+
+    _HAVE_LXML = True
+except ImportError:  # lxml is optional; stdlib ET is API-compatible for what we use
+    import xml.etree.ElementTree as ET  # type: ignore[no-redef]
+
+    _HAVE_LXML = False
 from dataclasses import dataclass
-from typing import Dict, Optional
+from typing import Dict, Mapping, Optional
 
 
 LIVE_PROVIDER_RE = re.compile(r"^tv\.plex\.providers\.epg\.xmltv:(\d+)$")
 LIVE_PROVIDER_PATH_RE = re.compile(r"^/tv\.plex\.providers\.epg\.xmltv:(\d+)(?:/|$)")
+# Checked with str.startswith (one C memcmp) before the regex runs; most
+# proxied requests are not Live TV paths.
+LIVE_PROVIDER_PATH_PREFIX = "/tv.plex.providers.epg.xmltv:"
+
+# Hot-path element lookups, compiled once at import. With lxml these are real
+# ET.XPath objects; with stdlib ET, methodcaller hits findall's internal path
+# cache with the same call shape.
+if _HAVE_LXML:
+    _XP_MEDIA_PROVIDER = ET.XPath(".//MediaProvider")
+    _XP_CONTENT_DIR = ET.XPath("./Feature[@type='content']/Directory")
+    _XP_DIRECTORY = ET.XPath(".//Directory")
+else:
+    from operator import methodcaller
+
+    _XP_MEDIA_PROVIDER = methodcaller("findall", ".//MediaProvider")
+    _XP_CONTENT_DIR = methodcaller("findall", "./Feature[@type='content']/Directory")
+    _XP_DIRECTORY = methodcaller("findall", ".//Directory")
 HOP_HEADERS = {
     "connection",
     "keep-alive",
@@ -72,24 +101,49 @@ class ProxyConfig:
 class LabelMapCache:
     def __init__(self, cfg: ProxyConfig):
         self.cfg = cfg
-        self._lock = threading.Lock()
-        self._last_refresh = 0.0
-        self._map: Dict[str, str] = {}
-
-    def get(self) -> Dict[str, str]:
-        now = time.time()
-        with self._lock:
-            if now - self._last_refresh < self.cfg.refresh_seconds and self._map:
-                return dict(self._map)
-        self.refresh()
-        with self._lock:
-            return dict(self._map)
+        # Serializes upstream fetches only; readers never take a lock. The
+        # whole (timestamp, view, version) state swaps as one tuple, and
+        # reference assignment is atomic in CPython.
+        self._refresh_lock = threading.Lock()
+        self._inflight_lock = threading.Lock()
+        self._inflight: Optional[threading.Thread] = None
+        self._state: tuple[float, Mapping[str, str], int] = (0.0, MappingProxyType({}), 0)
+
+    def get(self) -> Mapping[str, str]:
+        ts, view, _ = self._state
+        if time.time() - ts < self.cfg.refresh_seconds and view:
+            return view
+        if not view:
+            # First population blocks: there is nothing to serve yet.
+            self.refresh()
+            return self._state[1]
+        # Stale: single-flight — one background refresh regardless of how many
+        # request threads notice staleness; everyone keeps serving the stale
+        # view in the meantime.
+        with self._inflight_lock:
+            if self._inflight is None:
+                t = threading.Thread(target=self._refresh_background, daemon=True)
+                self._inflight = t
+                t.start()
+        return view
+
+    def _refresh_background(self) -> None:
+        try:
+            self.refresh()
+        except Exception:  # noqa: BLE001 - keep serving the stale map
+            logging.exception("background label-map refresh failed")
+        finally:
+            with self._inflight_lock:
+                self._inflight = None
+
+    @property
+    def version(self) -> int:
+        return self._state[2]
 
     def refresh(self) -> None:
-        mp = fetch_dvr_label_map(self.cfg)
-        with self._lock:
-            self._map = mp
-            self._last_refresh = time.time()
+        with self._refresh_lock:
+            mp = fetch_dvr_label_map(self.cfg)
+            self._state = (time.time(), MappingProxyType(mp), self._state[2] + 1)
         logging.info("refreshed DVR label map (%d entries)", len(mp))
 
 
@@ -106,40 +160,140 @@ def build_http_conn(url: str) -> tuple[http.client.HTTPConnection, urllib.parse.
     return conn, pu
 
 
+class _UpstreamPool(threading.local):
+    """One keep-alive upstream connection per thread."""
+
+    conn: Optional[http.client.HTTPConnection] = None
+
+
+_upstream_pool = _UpstreamPool()
+
+
+def upstream_request(
+    url: str,
+    method: str,
+    path: str,
+    body: bytes = b"",
+    headers: Optional[Dict[str, str]] = None,
+) -> http.client.HTTPResponse:
+    """Issue a request on this thread's pooled connection, retrying once on a
+    fresh socket if the kept-alive one went stale."""
+    if _upstream_pool.conn is None:
+        _upstream_pool.conn, _ = build_http_conn(url)
+    for attempt in (0, 1):
+        try:
+            _upstream_pool.conn.request(method, path, body=body, headers=headers or {})
+            return _upstream_pool.conn.getresponse()
+        except (http.client.HTTPException, OSError):
+            _upstream_pool.conn.close()
+            _upstream_pool.conn, _ = build_http_conn(url)
+            if attempt:
+                raise
+    raise AssertionError("unreachable")
+
+
 def fetch_dvr_label_map(cfg: ProxyConfig) -> Dict[str, str]:
-    conn, pu = build_http_conn(cfg.upstream)
-    path = "/livetv/dvrs"
     qs = urllib.parse.urlencode({"X-Plex-Token": cfg.token})
-    conn.request("GET", f"{path}?{qs}", headers={"Accept": "application/xml"})
-    resp = conn.getresponse()
+    resp = upstream_request(
+        cfg.upstream, "GET", f"/livetv/dvrs?{qs}", headers={"Accept": "application/xml"}
+    )
     body = resp.read()
     if resp.status != 200:
         raise RuntimeError(f"/livetv/dvrs returned {resp.status}: {body[:200]!r}")
 
-    root = ET.fromstring(body)
     out: Dict[str, str] = {}
-    for dvr in root.findall(".//Dvr"):
-        dvr_id = dvr.attrib.get("key") or dvr.attrib.get("id")
-        if not dvr_id:
-            continue
-        label = dvr.attrib.get("lineupTitle") or dvr.attrib.get("title") or ""
-        if not label:
-            lineup = dvr.attrib.get("lineup", "")
-            if "#" in lineup:
-                label = lineup.rsplit("#", 1)[-1]
-        if not label:
-            continue
-        if cfg.strip_prefix and label.startswith(cfg.strip_prefix):
-            label = label[len(cfg.strip_prefix) :]
-        out[f"tv.plex.providers.epg.xmltv:{dvr_id}"] = label
+    # iterparse + clear keeps memory bounded for large lineups: only the
+    # current <Dvr> element is ever materialized, never the full tree.
+    for _, elem in ET.iterparse(io.BytesIO(body), events=("end",)):
+        if elem.tag == "Dvr":
+            dvr_id = elem.attrib.get("key") or elem.attrib.get("id")
+            label = elem.attrib.get("lineupTitle") or elem.attrib.get("title") or ""
+            if not label:
+                lineup = elem.attrib.get("lineup", "")
+                if "#" in lineup:
+                    label = lineup.rsplit("#", 1)[-1]
+            if dvr_id and label:
+                if cfg.strip_prefix and label.startswith(cfg.strip_prefix):
+                    label = label[len(cfg.strip_prefix) :]
+                out[f"tv.plex.providers.epg.xmltv:{dvr_id}"] = label
+        elem.clear()
     return out
 
 
-def rewrite_media_providers_xml(xml_bytes: bytes, label_map: Dict[str, str]) -> bytes:
+_LIVE_PROVIDER_NEEDLE = b"tv.plex.providers.epg.xmltv:"
+
+_MP_TAG_RE = re.compile(rb"<MediaProvider\b[^>]*>")
+_DIR_TAG_RE = re.compile(rb"<Directory\b[^>]*>")
+_IDENT_ATTR_RE = re.compile(rb'\bidentifier="([^"]*)"')
+_ID_ATTR_RE = re.compile(rb'\bid="([^"]*)"')
+_KEY_ATTR_RE = re.compile(rb'\bkey="([^"]*)"')
+_LABEL_ATTR_RES = {
+    attr: re.compile(rb"\b" + attr + rb'="[^"]*"')
+    for attr in (b"friendlyName", b"sourceTitle", b"title")
+}
+
+
+def _xml_attr_bytes(value: str) -> bytes:
+    return (
+        value.replace("&", "&amp;")
+        .replace("<", "&lt;")
+        .replace('"', "&quot;")
+        .encode("utf-8")
+    )
+
+
+def _set_tag_attr(tag: bytes, attr: bytes, value: bytes) -> bytes:
+    out, n = _LABEL_ATTR_RES[attr].subn(attr + b'="' + value + b'"', tag)
+    if n:
+        return out
+    end = len(tag) - (2 if tag.endswith(b"/>") else 1)
+    return tag[:end].rstrip() + b" " + attr + b'="' + value + b'"' + tag[end:]
+
+
+def _regex_rewrite_media_providers(xml_bytes: bytes, label_map: Mapping[str, str]) -> bytes:
+    labels = {ident.encode(): _xml_attr_bytes(label) for ident, label in label_map.items()}
+
+    def mp_sub(m: re.Match[bytes]) -> bytes:
+        tag = m.group(0)
+        im = _IDENT_ATTR_RE.search(tag)
+        label = labels.get(im.group(1)) if im else None
+        if label is None:
+            return tag
+        for attr in (b"friendlyName", b"sourceTitle", b"title"):
+            tag = _set_tag_attr(tag, attr, label)
+        return tag
+
+    def dir_sub(m: re.Match[bytes]) -> bytes:
+        tag = m.group(0)
+        im = _ID_ATTR_RE.search(tag)
+        if im is not None and im.group(1) in labels:
+            return _set_tag_attr(tag, b"title", labels[im.group(1)])
+        km = _KEY_ATTR_RE.search(tag)
+        if km is not None and b'title="Guide"' in tag:
+            key = km.group(1)
+            if key.startswith(b"/") and key.endswith(b"/watchnow") and key[1:-9] in labels:
+                return _set_tag_attr(tag, b"title", labels[key[1:-9]] + b" Guide")
+        return tag
+
+    out = _MP_TAG_RE.sub(mp_sub, xml_bytes)
+    return _DIR_TAG_RE.sub(dir_sub, out)
+
+
+def rewrite_media_providers_xml(xml_bytes: bytes, label_map: Mapping[str, str]) -> bytes:
+    # Cheap substring scan first: bodies without any live-provider identifier
+    # (the common case on non-DVR servers) skip DOM construction entirely.
+    if not label_map or _LIVE_PROVIDER_NEEDLE not in xml_bytes:
+        return xml_bytes
+    # Fast path: targeted attribute substitutions on the raw bytes, no tree
+    # build or re-serialize, and upstream formatting passes through untouched.
+    try:
+        return _regex_rewrite_media_providers(xml_bytes, label_map)
+    except Exception:  # noqa: BLE001 - fall back to the DOM rewrite on any surprise
+        logging.exception("regex providers rewrite failed, using DOM path")
     root = ET.fromstring(xml_bytes)
     changed = 0
 
-    for mp in root.findall(".//MediaProvider"):
+    for mp in _XP_MEDIA_PROVIDER(root):
         ident = mp.attrib.get("identifier", "")
         if not LIVE_PROVIDER_RE.match(ident):
             continue
@@ -154,7 +308,7 @@ def rewrite_media_providers_xml(xml_bytes: bytes, label_map: Dict[str, str]) ->
         mp.attrib["title"] = label
 
         # Content root directory title often backs source lists on some clients.
-        for directory in mp.findall("./Feature[@type='content']/Directory"):
+        for directory in _XP_CONTENT_DIR(mp):
             d_id = directory.attrib.get("id", "")
             d_key = directory.attrib.get("key", "")
             if d_id == ident:
@@ -166,12 +320,12 @@ def rewrite_media_providers_xml(xml_bytes: bytes, label_map: Dict[str, str]) ->
     if not changed:
         return xml_bytes
 
-    buf = io.BytesIO()
-    ET.ElementTree(root).write(buf, encoding="utf-8", xml_declaration=True)
-    return buf.getvalue()
+    return ET.tostring(root, encoding="utf-8", xml_declaration=True)
 
 
-def rewrite_provider_scoped_xml(path: str, xml_bytes: bytes, label_map: Dict[str, str]) -> bytes:
+def rewrite_provider_scoped_xml(path: str, xml_bytes: bytes, label_map: Mapping[str, str]) -> bytes:
+    if not path.startswith(LIVE_PROVIDER_PATH_PREFIX):
+        return xml_bytes
     m = LIVE_PROVIDER_PATH_RE.match(path)
     if not m:
         return xml_bytes
@@ -196,7 +350,7 @@ def rewrite_provider_scoped_xml(path: str, xml_bytes: bytes, label_map: Dict[str
         root.attrib["friendlyName"] = label
         changed = True
 
-    for d in root.findall(".//Directory"):
+    for d in _XP_DIRECTORY(root):
         d_title = d.attrib.get("title", "")
         d_key = d.attrib.get("key", "")
         d_id = d.attrib.get("id", "")
@@ -213,9 +367,7 @@ def rewrite_provider_scoped_xml(path: str, xml_bytes: bytes, label_map: Dict[str
     if not changed:
         return xml_bytes
 
-    buf = io.BytesIO()
-    ET.ElementTree(root).write(buf, encoding="utf-8", xml_declaration=True)
-    return buf.getvalue()
+    return ET.tostring(root, encoding="utf-8", xml_declaration=True)
 
 
 def rewrite_tuner_entitlement_flags(body: bytes) -> bytes:
@@ -259,7 +411,7 @@ def is_live_tv_request(method: str, path: str, headers: Dict[str, str]) -> bool:
         return True
     if req_path.startswith("/livetv/"):
         return True
-    if req_path.startswith("/tv.plex.providers.epg.xmltv:"):
+    if req_path.startswith(LIVE_PROVIDER_PATH_PREFIX):
         return True
     if req_path.startswith("/video/:/transcode/"):
         return query_param_is_live_tv_path(query, "path")
@@ -309,10 +461,24 @@ class ThreadingHTTPServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
     daemon_threads = True
 
 
+_REWRITE_CACHE_MAX = 16
+
+
 def make_handler(cfg: ProxyConfig, cache: LabelMapCache):
     conn_pu = urllib.parse.urlparse(cfg.upstream)
     upstream_base_path = conn_pu.path.rstrip("/")
 
+    # Upstream XML is usually byte-identical between DVR changes, so rewritten
+    # bodies are cached by (body digest, request path, label-map version).
+    # Entries are [plain, gzipped-or-None]; the gzipped form is filled in
+    # lazily so repeat gzip responses skip recompression too.
+    rewrite_cache: OrderedDict[tuple, list] = OrderedDict()
+    rewrite_cache_lock = threading.Lock()
+
+    # Overlaps label-map lookups (which may trigger a blocking first refresh)
+    # with the upstream PMS fetch on rewrite-eligible requests.
+    labels_executor = ThreadPoolExecutor(max_workers=4)
+
     class Handler(http.server.BaseHTTPRequestHandler):
         protocol_version = "HTTP/1.1"
 
@@ -347,11 +513,44 @@ def make_handler(cfg: ProxyConfig, cache: LabelMapCache):
                 logging.exception("proxy error: %s", exc)
                 self.send_error(502, f"proxy error: {exc}")
 
+        def _stream_response(self, resp: http.client.HTTPResponse) -> None:
+            self.send_response(resp.status, resp.reason)
+            content_length = resp.getheader("Content-Length")
+            for k, v in resp.getheaders():
+                lk = k.lower()
+                if lk in HOP_HEADERS or lk == "content-length":
+                    continue
+                self.send_header(k, v)
+            # 1xx/204/304 must not carry a body or Transfer-Encoding; send
+            # headers only and drain whatever http.client buffered.
+            if resp.status < 200 or resp.status in (204, 304):
+                self.end_headers()
+                while resp.read(65536):
+                    pass
+                return
+            chunked = content_length is None
+            if chunked:
+                # http.client already de-chunked the upstream body, so re-frame it.
+                self.send_header("Transfer-Encoding", "chunked")
+            else:
+                self.send_header("Content-Length", content_length)
+            self.end_headers()
+            if self.command == "HEAD":
+                while resp.read(65536):  # drain to keep the pooled conn reusable
+                    pass
+                return
+            while chunk := resp.read(65536):
+                if chunked:
+                    self.wfile.write(b"%x\r\n" % len(chunk) + chunk + b"\r\n")
+                else:
+                    self.wfile.write(chunk)
+            if chunked:
+                self.wfile.write(b"0\r\n\r\n")
+
         def _proxy_inner(self):
             content_len = int(self.headers.get("Content-Length", "0") or "0")
             body = self.rfile.read(content_len) if content_len else b""
 
-            upstream_conn, pu = build_http_conn(cfg.upstream)
             path = self.path
             if upstream_base_path:
                 if path.startswith("/"):
@@ -367,8 +566,7 @@ def make_handler(cfg: ProxyConfig, cache: LabelMapCache):
                     continue
                 headers[k] = v
 
-            upstream_host = pu.netloc
-            headers["Host"] = upstream_host
+            headers["Host"] = conn_pu.netloc
             if cfg.elevate_live_tv:
                 path, headers, elevated = apply_live_tv_token_elevation(
                     self.command,
@@ -379,37 +577,69 @@ def make_handler(cfg: ProxyConfig, cache: LabelMapCache):
                 if elevated:
                     logging.info("elevated Live TV request %s %s", self.command, urllib.parse.urlsplit(self.path).path)
 
-            upstream_conn.request(self.command, path, body=body, headers=headers)
-            resp = upstream_conn.getresponse()
-            resp_body = resp.read()
-
             parsed = urllib.parse.urlparse(self.path)
             is_media_providers = parsed.path == "/media/providers"
-            is_provider_scoped = bool(LIVE_PROVIDER_PATH_RE.match(parsed.path))
+            is_provider_scoped = parsed.path.startswith(LIVE_PROVIDER_PATH_PREFIX) and bool(
+                LIVE_PROVIDER_PATH_RE.match(parsed.path)
+            )
+            labels_future = None
+            if is_media_providers or is_provider_scoped:
+                labels_future = labels_executor.submit(cache.get)
+
+            resp = upstream_request(cfg.upstream, self.command, path, body=body, headers=headers)
+
             ct = resp.getheader("Content-Type", "")
             content_encoding = (resp.getheader("Content-Encoding") or "").lower()
-            should_rewrite_xml = (
-                resp.status == 200
-                and (is_media_providers or is_provider_scoped or cfg.elevate_live_tv)
-                and looks_like_xml(ct, resp_body)
+            buffer_eligible = resp.status == 200 and (
+                is_media_providers
+                or is_provider_scoped
+                or (cfg.elevate_live_tv and "xml" in (ct or "").lower())
             )
+            if not buffer_eligible:
+                # Thumbnails, segments, and other pass-through bodies stream
+                # upstream -> client in fixed-size chunks instead of being
+                # buffered whole in memory.
+                self._stream_response(resp)
+                return
+
+            resp_body = resp.read()
+            should_rewrite_xml = looks_like_xml(ct, resp_body)
             if should_rewrite_xml:
                 try:
                     raw_body = resp_body
                     if content_encoding == "gzip":
                         raw_body = gzip.decompress(resp_body)
-                    rewritten = raw_body
-                    if cfg.elevate_live_tv:
-                        rewritten = rewrite_tuner_entitlement_flags(rewritten)
-                    labels = cache.get()
-                    if is_media_providers:
-                        rewritten = rewrite_media_providers_xml(rewritten, labels)
-                    if is_provider_scoped:
-                        rewritten = rewrite_provider_scoped_xml(parsed.path, rewritten, labels)
+                    # Resolved by now in the common case; only set for the two
+                    # label-rewrite paths, which are the only consumers.
+                    labels = labels_future.result() if labels_future is not None else {}
+                    key = (
+                        hashlib.blake2b(raw_body, digest_size=16).digest(),
+                        parsed.path,
+                        cache.version,
+                    )
+                    with rewrite_cache_lock:
+                        entry = rewrite_cache.get(key)
+                        if entry is not None:
+                            rewrite_cache.move_to_end(key)
+                    if entry is None:
+                        rewritten = raw_body
+                        if cfg.elevate_live_tv:
+                            rewritten = rewrite_tuner_entitlement_flags(rewritten)
+                        if is_media_providers:
+                            rewritten = rewrite_media_providers_xml(rewritten, labels)
+                        if is_provider_scoped:
+                            rewritten = rewrite_provider_scoped_xml(parsed.path, rewritten, labels)
+                        entry = [rewritten, None]
+                        with rewrite_cache_lock:
+                            rewrite_cache[key] = entry
+                            while len(rewrite_cache) > _REWRITE_CACHE_MAX:
+                                rewrite_cache.popitem(last=False)
                     if content_encoding == "gzip":
-                        resp_body = gzip.compress(rewritten)
+                        if entry[1] is None:
+                            entry[1] = gzip.compress(entry[0], compresslevel=1)
+                        resp_body = entry[1]
                     else:
-                        resp_body = rewritten
+                        resp_body = entry[0]
                 except Exception as exc:  # noqa: BLE001
                     logging.exception("rewrite failed, passing through: %s", exc)
 
@@ -16,15 +16,23 @@ Credentials are derived from the first movie stream URL in the catalog:
 from __future__ import annotations
 
 import argparse
+import http.client
 import json
 import os
+import queue
 import sys
+import tempfile
+import threading
 import time
 import urllib.parse
-import urllib.request
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Any
 
+try:
+    import orjson
+except ImportError:  # optional accelerator; stdlib json works fine
+    orjson = None
+
 
 def _derive_provider_from_catalog(catalog: dict[str, Any]) -> tuple[str, str, str, str]:
     movies = catalog.get("movies") or []
@@ -46,10 +54,83 @@ def _derive_provider_from_catalog(catalog: dict[str, Any]) -> tuple[str, str, st
     return api_base, stream_base, user, pw
 
 
+def _loads(data: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data.decode("utf-8", "replace"))
+
+
+def _read_json_file(path: str) -> Any:
+    with open(path, "rb") as f:
+        return _loads(f.read())
+
+
+def _write_json_file(path: str, obj: Any) -> None:
+    with open(path, "wb") as f:
+        if orjson is not None:
+            f.write(orjson.dumps(obj))
+        else:
+            f.write(json.dumps(obj).encode("utf-8"))
+
+
+def _write_json_atomic(path: str, obj: Any) -> None:
+    """Write via temp file + rename so readers never see a truncated file."""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            if orjson is not None:
+                f.write(orjson.dumps(obj))
+            else:
+                f.write(json.dumps(obj).encode("utf-8"))
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def _http_conn(pu: urllib.parse.SplitResult, timeout: int) -> http.client.HTTPConnection:
+    host = pu.hostname or "127.0.0.1"
+    port = pu.port or (443 if pu.scheme == "https" else 80)
+    if pu.scheme == "https":
+        return http.client.HTTPSConnection(host, port, timeout=timeout)
+    return http.client.HTTPConnection(host, port, timeout=timeout)
+
+
+class _WorkerConn(threading.local):
+    """One keep-alive provider connection per worker thread."""
+
+    conn: http.client.HTTPConnection | None = None
+
+
+_worker_conn = _WorkerConn()
+
+
 def _load_json(url: str, timeout: int) -> Any:
-    req = urllib.request.Request(url, headers={"User-Agent": "IptvTunerr/1.0"})
-    with urllib.request.urlopen(req, timeout=timeout) as r:
-        return json.loads(r.read().decode("utf-8", "replace"))
+    pu = urllib.parse.urlsplit(url)
+    target = urllib.parse.urlunsplit(("", "", pu.path, pu.query, ""))
+    headers = {"User-Agent": "IptvTunerr/1.0", "Accept": "application/json"}
+    if _worker_conn.conn is None:
+        _worker_conn.conn = _http_conn(pu, timeout)
+    body = b""
+    status, reason = 0, ""
+    for attempt in (0, 1):
+        try:
+            _worker_conn.conn.request("GET", target, headers=headers)
+            resp = _worker_conn.conn.getresponse()
+            status, reason = resp.status, resp.reason
+            body = resp.read()
+            break
+        except (http.client.HTTPException, OSError):
+            _worker_conn.conn.close()
+            _worker_conn.conn = _http_conn(pu, timeout)
+            if attempt:
+                raise
+    if status != 200:
+        raise OSError(f"HTTP {status} {reason} for {pu.path}")
+    return _loads(body)
 
 
 def _parse_xtream_episodes(v: Any) -> list[dict[str, Any]]:
@@ -63,7 +144,8 @@ def _parse_xtream_episodes(v: Any) -> list[dict[str, Any]]:
                     if not isinstance(item, dict):
                         continue
                     if not item.get("season_num"):
-                        item = dict(item)
+                        # Safe to mutate in place: the parsed response dict is
+                        # discarded right after this pass.
                         try:
                             item["season_num"] = int(season_key)
                         except Exception:
@@ -74,6 +156,16 @@ def _parse_xtream_episodes(v: Any) -> list[dict[str, Any]]:
     return out
 
 
+def _drain_stdout(q: queue.SimpleQueue) -> None:
+    """Print queued progress snapshots so workers never block on stdout."""
+    while True:
+        snap = q.get()
+        if snap is None:
+            return
+        sys.stdout.write(json.dumps(snap) + "\n")
+        sys.stdout.flush()
+
+
 def _rebuild_series(
     series_row: dict[str, Any],
     api_base: str,
@@ -106,6 +198,7 @@ def _rebuild_series(
 
     eps = _parse_xtream_episodes((info or {}).get("episodes"))
     by_season: dict[int, list[dict[str, Any]]] = {}
+    url_prefix = f"{stream_base}/series/{user}/{pw}/"
     for ep in eps:
         try:
             ep_id = str(ep.get("id") or "")
@@ -116,7 +209,7 @@ def _rebuild_series(
         if not ep_id or sn <= 0 or en <= 0:
             continue
         ext = (str(ep.get("container_extension") or "mp4").strip() or "mp4")
-        stream_url = f"{stream_base}/series/{user}/{pw}/{ep_id}.{ext}"
+        stream_url = url_prefix + ep_id + "." + ext
         by_season.setdefault(sn, []).append(
             {
                 "id": ep_id,
@@ -155,8 +248,7 @@ def main() -> int:
     )
     args = ap.parse_args()
 
-    with open(args.catalog_in) as f:
-        catalog = json.load(f)
+    catalog = _read_json_file(args.catalog_in)
 
     api_base, stream_base, user, pw = _derive_provider_from_catalog(catalog)
     series = list(catalog.get("series") or [])
@@ -165,8 +257,7 @@ def main() -> int:
 
     retry_sids: set[str] | None = None
     if args.retry_failed_from:
-        with open(args.retry_failed_from) as f:
-            p = json.load(f)
+        p = _read_json_file(args.retry_failed_from)
         retry_sids = {
             str(x.get("sid"))
             for x in (p.get("fail_examples") or [])
@@ -189,13 +280,15 @@ def main() -> int:
     )
 
     start = time.time()
-    out_series = list(catalog.get("series") or [])
-    by_sid_index = {str(s.get("id") or ""): i for i, s in enumerate(out_series)}
+    # Mutated in place; out_catalog["series"] is reassigned below anyway, so
+    # there is no need to duplicate what can be an MB-scale array.
+    out_series = catalog.get("series") or []
     stats = {"done": 0, "ok": 0, "fail": 0, "eps": 0, "seasons": 0, "started_at": int(start)}
     fail_examples: list[dict[str, Any]] = []
 
     items: list[tuple[int, dict[str, Any]]] = []
     if retry_sids is not None:
+        by_sid_index = {str(s.get("id") or ""): i for i, s in enumerate(out_series)}
         for sid in retry_sids:
             i = by_sid_index.get(sid)
             if i is None:
@@ -204,6 +297,10 @@ def main() -> int:
     else:
         items = [(i, s) for i, s in enumerate(series)]
 
+    progress_q: queue.SimpleQueue = queue.SimpleQueue()
+    printer = threading.Thread(target=_drain_stdout, args=(progress_q,), daemon=True)
+    printer.start()
+
     with ThreadPoolExecutor(max_workers=args.workers) as ex:
         fut_map = {
             ex.submit(_rebuild_series, s, api_base, stream_base, user, pw, args.timeout): idx
@@ -223,21 +320,22 @@ def main() -> int:
                 if len(fail_examples) < 50:
                     fail_examples.append(meta)
 
-            if stats["done"] % 100 == 0 or stats["done"] == len(items):
+            if stats["done"] % 500 == 0 or stats["done"] == len(items):
                 snap = {
                     **stats,
                     "elapsed_s": round(time.time() - start, 1),
                     "fail_examples": fail_examples,
                 }
                 if args.progress_out:
-                    with open(args.progress_out, "w") as f:
-                        json.dump(snap, f)
-                print(json.dumps(snap), flush=True)
+                    _write_json_atomic(args.progress_out, snap)
+                progress_q.put_nowait(snap)
+
+    progress_q.put_nowait(None)
+    printer.join()
 
     out_catalog = dict(catalog)
     out_catalog["series"] = out_series
-    with open(args.catalog_out, "w") as f:
-        json.dump(out_catalog, f)
+    _write_json_file(args.catalog_out, out_catalog)
 
     summary = {
         **stats,
@@ -248,8 +346,7 @@ def main() -> int:
         "fail_examples": fail_examples,
     }
     if args.progress_out:
-        with open(args.progress_out, "w") as f:
-            json.dump(summary, f)
+        _write_json_atomic(args.progress_out, summary)
     print(json.dumps(summary), flush=True)
     return 0
 